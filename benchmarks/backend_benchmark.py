@@ -0,0 +1,159 @@
+"""Compares the CLI and NAPALM collection backends on recorded output.
+
+Each backend collects interfaces, VLANs, VRFs and facts from N simulated
+Cisco IOS switches; the report shows throughput, per-host latency, the
+time spent parsing and the number of device commands sent::
+
+    python -m benchmarks.backend_benchmark --hosts 10 100 1000
+"""
+
+import argparse
+import json
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, List
+from nornir.core.task import Result, Task
+from benchmarks import simulated_devices
+from benchmarks.run_benchmarks import build_nornir, run_isolated_call
+from benchmarks.simulated_devices import SimulatedDevice
+from src.collection.backends import NapalmBackend
+from src.instrumentation.timing import (
+    PhaseTimer,
+    TimingProcessor,
+    percentile,
+    set_active_timer,
+)
+from src.tasks.base_task import BaseTask
+
+GETTERS = ["interfaces", "vlans", "vrfs", "facts"]
+
+
+class CollectTask(BaseTask):
+    """Runs every getter through whichever backend the host's platform
+    selects."""
+
+    def __init__(self, backends) -> None:
+        self.backends = backends
+
+    def propose(self, nr):
+        return nr.run(task=self.collect)
+
+    apply = propose
+
+    def collect(self, task: Task) -> Result:
+        backend = self.backend(task.host)
+        return Result(
+            host=task.host,
+            result={getter: getattr(backend, getter)(task) for getter in GETTERS},
+        )
+
+
+def count_commands(counter: Counter) -> None:
+    send_command = SimulatedDevice.send_command
+
+    def counted(self: SimulatedDevice, command_string: str, **kwargs: Any) -> str:
+        counter[command_string] += 1
+        return send_command(self, command_string, **kwargs)
+
+    SimulatedDevice.send_command = counted
+
+
+def run_backend(
+    name: str,
+    num_hosts: int,
+    num_workers: int,
+    connect_latency: float,
+    command_latency: float,
+) -> Dict[str, Any]:
+    simulated_devices.install(
+        connect_latency=connect_latency, command_latency=command_latency
+    )
+    commands: Counter = Counter()
+    count_commands(commands)
+    timer = PhaseTimer()
+    set_active_timer(timer)
+    nr = build_nornir(num_hosts, num_workers)
+    nr = nr.with_processors([TimingProcessor(timer)])
+    backends = {"cisco_ios": NapalmBackend()} if name == "napalm" else {}
+
+    start = time.perf_counter()
+    result = CollectTask(backends).propose(nr)
+    elapsed = time.perf_counter() - start
+
+    failed = [host for host, r in result.items() if r.failed]
+    if failed:
+        logging.error(f"{name}: {len(failed)} hosts failed, e.g. {result[failed[0]]}")
+    sample = result[next(iter(result))][0].result
+    host_times = list(timer.host_totals().values())
+    return {
+        "backend": name,
+        "hosts": num_hosts,
+        "seconds": elapsed,
+        "hosts_per_second": num_hosts / elapsed if elapsed else 0.0,
+        "p50": percentile(host_times, 50),
+        "p95": percentile(host_times, 95),
+        "parse_seconds": sum(timer.durations.get("parse", {}).values()),
+        "commands_per_host": sum(commands.values()) / num_hosts,
+        "failed": len(failed),
+        "sample": sample,
+    }
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    header = (
+        f"{'backend':<8}{'hosts':>7}{'seconds':>9}{'hosts/s':>9}{'p50':>8}"
+        f"{'p95':>8}{'textfsm s':>10}{'cmds/host':>10}{'failed':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['backend']:<8}{r['hosts']:>7}{r['seconds']:>9.2f}"
+            f"{r['hosts_per_second']:>9.1f}{r['p50']:>8.3f}{r['p95']:>8.3f}"
+            f"{r['parse_seconds']:>10.2f}{r['commands_per_host']:>10.1f}"
+            f"{r['failed']:>7}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument(
+        "--backends", nargs="+", choices=["cli", "napalm"], default=["cli", "napalm"]
+    )
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--connect-latency", type=float, default=0.05)
+    parser.add_argument("--command-latency", type=float, default=0.01)
+    parser.add_argument(
+        "--show-sample", action="store_true", help="print one host's data per run"
+    )
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    results = []
+    for num_hosts in args.hosts:
+        for backend in args.backends:
+            results.append(
+                run_isolated_call(
+                    run_backend,
+                    backend,
+                    num_hosts,
+                    args.workers,
+                    args.connect_latency,
+                    args.command_latency,
+                )
+            )
+
+    print_report(results)
+    if args.show_sample:
+        for r in results:
+            print(f"\n{r['backend']}: {json.dumps(r['sample'], indent=2, default=str)}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
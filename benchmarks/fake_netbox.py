@@ -0,0 +1,385 @@
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# Foreign keys per collection, pointing at the collection they reference.
+REFERENCES = {
+    "dcim/devices": {
+        "site": "dcim/sites",
+        "device_type": "dcim/device-types",
+        "role": "dcim/device-roles",
+        "primary_ip": "ipam/ip-addresses",
+        "primary_ip4": "ipam/ip-addresses",
+    },
+    "dcim/device-types": {"manufacturer": "dcim/manufacturers"},
+    "dcim/interfaces": {"device": "dcim/devices", "vrf": "ipam/vrfs"},
+    "dcim/inventory-items": {
+        "device": "dcim/devices",
+        "manufacturer": "dcim/manufacturers",
+        "role": "dcim/inventory-item-roles",
+    },
+    "ipam/ip-addresses": {"vrf": "ipam/vrfs"},
+    "ipam/prefixes": {"site": "dcim/sites", "vrf": "ipam/vrfs", "role": "ipam/roles"},
+}
+
+NESTED_FIELDS = ("name", "slug", "model", "address", "prefix")
+PAGING_PARAMS = {"limit", "offset", "brief", "ordering"}
+
+
+class NotFound(Exception):
+    pass
+
+
+def field_matches(actual: Any, expected: Any) -> bool:
+    if isinstance(actual, dict):
+        return str(expected) in {
+            str(actual.get(key)) for key in ("id",) + NESTED_FIELDS if key in actual
+        }
+    if isinstance(actual, bool):
+        return str(actual).lower() == str(expected).lower()
+    return str(actual) == str(expected)
+
+
+class NetBoxStore:
+    """In-memory NetBox objects, enough of the REST semantics for pynetbox."""
+
+    def __init__(self, base_url: str) -> None:
+        self.base_url = base_url
+        self.lock = threading.Lock()
+        self.collections: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self.next_id = 1
+
+    def url(self, collection: str, object_id: int) -> str:
+        return f"{self.base_url}/api/{collection}/{object_id}/"
+
+    def nested(self, collection: str, obj: Dict[str, Any]) -> Dict[str, Any]:
+        nested = {"id": obj["id"], "url": self.url(collection, obj["id"])}
+        for key in NESTED_FIELDS:
+            if key in obj:
+                nested[key] = obj[key]
+        nested["display"] = str(
+            next((obj[k] for k in NESTED_FIELDS if k in obj), obj["id"])
+        )
+        return nested
+
+    def find(self, collection: str, criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
+        objects = self.collections.get(collection, {}).values()
+        matched = []
+        for obj in objects:
+            if all(self.matches(obj, key, value) for key, value in criteria.items()):
+                matched.append(obj)
+        return matched
+
+    def matches(self, obj: Dict[str, Any], key: str, value: Any) -> bool:
+        if key.endswith("__ie"):
+            # Case-insensitive exact match, as NetBox's lookup of that name.
+            values = value if isinstance(value, list) else [value]
+            actual = str(obj.get(key[:-4])).lower()
+            return any(actual == str(item).lower() for item in values)
+        if key not in obj and key.endswith("_id"):
+            key = key[:-3]
+        if isinstance(value, list):
+            return any(self.matches(obj, key, item) for item in value)
+        if isinstance(value, dict):
+            actual = obj.get(key)
+            return isinstance(actual, dict) and all(
+                self.matches(actual, k, v) for k, v in value.items()
+            )
+        return field_matches(obj.get(key), value)
+
+    def resolve(self, collection: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        resolved = {}
+        references = REFERENCES.get(collection, {})
+        for key, value in data.items():
+            target = references.get(key)
+            if target is None or value is None:
+                resolved[key] = value
+                continue
+            if isinstance(value, dict):
+                criteria = value
+            else:
+                criteria = {"id": value}
+            matches = self.find(target, criteria)
+            if not matches:
+                raise NotFound(f"{key}: related object not found using {value}")
+            resolved[key] = self.nested(target, matches[0])
+        return resolved
+
+    def create(self, collection: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        with self.lock:
+            obj = self.resolve(collection, data)
+            obj["id"] = self.next_id
+            obj["url"] = self.url(collection, self.next_id)
+            self.next_id += 1
+            self.collections.setdefault(collection, {})[obj["id"]] = obj
+            return dict(obj)
+
+    def update(
+        self, collection: str, object_id: int, data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        with self.lock:
+            obj = self.collections.get(collection, {}).get(object_id)
+            if obj is None:
+                raise NotFound(f"{collection} {object_id} not found")
+            obj.update(self.resolve(collection, data))
+            return dict(obj)
+
+    def delete(self, collection: str, object_id: int) -> None:
+        with self.lock:
+            if self.collections.get(collection, {}).pop(object_id, None) is None:
+                raise NotFound(f"{collection} {object_id} not found")
+
+    def get(self, collection: str, object_id: int) -> Dict[str, Any]:
+        with self.lock:
+            obj = self.collections.get(collection, {}).get(object_id)
+            if obj is None:
+                raise NotFound(f"{collection} {object_id} not found")
+            return dict(obj)
+
+    def list(self, collection: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        criteria = {k: v for k, v in params.items() if k not in PAGING_PARAMS}
+        with self.lock:
+            results = [dict(obj) for obj in self.find(collection, criteria)]
+        return {
+            "count": len(results),
+            "next": None,
+            "previous": None,
+            "results": results,
+        }
+
+
+class FakeNetBox:
+    """Local HTTP stand-in for the NetBox REST API.
+
+    ``latency`` adds a fixed server-side delay per request, and
+    ``requests`` counts calls per method and collection.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.latency = latency
+        self.requests: Counter = Counter()
+        self.server = ThreadingHTTPServer((host, port), self.handler_class())
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self.store = NetBoxStore(self.url)
+        self.thread: Optional[threading.Thread] = None
+
+    def handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this the
+            # client's delayed ACK adds ~40ms to every request.
+            disable_nagle_algorithm = True
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                fake.handle(self, "GET")
+
+            def do_POST(self) -> None:
+                fake.handle(self, "POST")
+
+            def do_PATCH(self) -> None:
+                fake.handle(self, "PATCH")
+
+            def do_PUT(self) -> None:
+                fake.handle(self, "PUT")
+
+            def do_DELETE(self) -> None:
+                fake.handle(self, "DELETE")
+
+        return Handler
+
+    @staticmethod
+    def route(path: str) -> Tuple[str, Optional[int]]:
+        parts = [part for part in path.split("/") if part][1:]
+        if parts and parts[-1].isdigit():
+            return "/".join(parts[:-1]), int(parts[-1])
+        return "/".join(parts), None
+
+    @staticmethod
+    def params(query: str) -> Dict[str, Any]:
+        # Repeated parameters are multi-value filters, matching any value.
+        return {
+            key: values[0] if len(values) == 1 else values
+            for key, values in parse_qs(query).items()
+        }
+
+    def handle(self, request: BaseHTTPRequestHandler, method: str) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        parsed = urlparse(request.path)
+        collection, object_id = self.route(parsed.path)
+        length = int(request.headers.get("Content-Length") or 0)
+        body = json.loads(request.rfile.read(length) or b"null") if length else None
+        if parsed.path.strip("/") == "graphql" and method == "POST":
+            self.requests[(method, "graphql")] += 1
+            self.respond(request, 200, self.graphql(body))
+            return
+        self.requests[(method, collection)] += 1
+        try:
+            status, payload = self.dispatch(
+                method, collection, object_id, self.params(parsed.query), body
+            )
+        except NotFound as e:
+            status, payload = (404 if method in ("GET", "DELETE") else 400), {
+                "detail": str(e)
+            }
+        self.respond(request, status, payload)
+
+    def dispatch(
+        self,
+        method: str,
+        collection: str,
+        object_id: Optional[int],
+        params: Dict[str, Any],
+        body: Any,
+    ) -> Tuple[int, Any]:
+        if collection in ("", "status"):
+            return 200, {"netbox-version": "4.0.0"}
+        if method == "GET" and object_id is None:
+            return 200, self.store.list(collection, params)
+        if method == "GET":
+            return 200, self.store.get(collection, object_id)
+        if method == "POST":
+            if isinstance(body, list):
+                return 201, [self.store.create(collection, item) for item in body]
+            return 201, self.store.create(collection, body)
+        if method in ("PATCH", "PUT"):
+            if object_id is None:
+                return 200, [
+                    self.store.update(collection, item.pop("id"), item) for item in body
+                ]
+            return 200, self.store.update(collection, object_id, body)
+        if method == "DELETE":
+            if object_id is None:
+                for item in body or []:
+                    self.store.delete(collection, item["id"])
+            else:
+                self.store.delete(collection, object_id)
+            return 204, None
+        return 405, {"detail": f"{method} not allowed"}
+
+    def graphql(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Answers the ``NetBoxSnapshot`` query from the store; IDs come back
+        as strings, as they do from NetBox."""
+        if "NetBoxSnapshot" not in body.get("query", ""):
+            return {"data": None, "errors": [{"message": "Unsupported query"}]}
+        variables = body.get("variables") or {}
+        store = self.store
+
+        def select(
+            collection: str, field: str, values: List[str], fold: bool = False
+        ) -> List[Dict]:
+            key = str.lower if fold else str
+            wanted = {key(value) for value in values or []}
+            with store.lock:
+                objects = list(store.collections.get(collection, {}).values())
+            return [obj for obj in objects if key(str(obj.get(field))) in wanted]
+
+        def nested(value: Any) -> Any:
+            if isinstance(value, dict):
+                return {
+                    k: str(v) if k == "id" else nested(v)
+                    for k, v in value.items()
+                    if k not in ("url", "display")
+                }
+            return value
+
+        devices = []
+        for device in select(
+            "dcim/devices", "name", variables.get("devices"), fold=True
+        ):
+            device = nested(device)
+            device["interfaces"] = [
+                nested(interface)
+                for interface in store.find(
+                    "dcim/interfaces", {"device": {"id": device["id"]}}
+                )
+            ]
+            devices.append(device)
+        data = {
+            "device_list": devices,
+            "ip_address_list": [
+                nested(obj)
+                for obj in select(
+                    "ipam/ip-addresses", "address", variables.get("addresses")
+                )
+            ],
+            "prefix_list": [
+                nested(obj)
+                for obj in select("ipam/prefixes", "prefix", variables.get("prefixes"))
+            ],
+            "manufacturer_list": [
+                nested(obj) for obj in select("dcim/manufacturers", "slug", ["cisco"])
+            ],
+            "device_type_list": [
+                nested(obj)
+                for obj in store.find(
+                    "dcim/device-types", {"manufacturer": {"slug": "cisco"}}
+                )
+            ],
+            "vrf_list": [
+                nested(obj) for obj in select("ipam/vrfs", "name", ["Global"])
+            ],
+            "role_list": [
+                nested(obj) for obj in select("ipam/roles", "name", ["Transit Network"])
+            ],
+        }
+        return {"data": data}
+
+    @staticmethod
+    def respond(request: BaseHTTPRequestHandler, status: int, payload: Any) -> None:
+        data = b"" if payload is None else json.dumps(payload).encode()
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("API-Version", "4.0")
+        request.send_header("Content-Length", str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+    def seed(self, sites: List[str]) -> None:
+        store = self.store
+        cisco = store.create("dcim/manufacturers", {"name": "Cisco", "slug": "cisco"})
+        for model in ("C9300L-48P-4G", "9300L"):
+            store.create(
+                "dcim/device-types",
+                {
+                    "model": model,
+                    "slug": f"cisco-{model.lower()}",
+                    "manufacturer": cisco["id"],
+                },
+            )
+        store.create(
+            "dcim/device-roles", {"name": "Access Switch", "slug": "access-switch"}
+        )
+        store.create(
+            "dcim/inventory-item-roles", {"name": "Stack Unit", "slug": "stack-unit"}
+        )
+        store.create("ipam/vrfs", {"name": "Global"})
+        store.create("ipam/roles", {"name": "Transit Network", "slug": "transit"})
+        for site in sites:
+            store.create("dcim/sites", {"name": site, "slug": site.lower()})
+
+    def reset(self, sites: List[str]) -> None:
+        with self.store.lock:
+            self.store.collections = {}
+            self.store.next_id = 1
+        self.requests.clear()
+        self.seed(sites)
+
+    def start(self) -> "FakeNetBox":
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
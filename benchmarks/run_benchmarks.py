@@ -0,0 +1,190 @@
+"""Offline throughput benchmark for the SSH and NetBox tasks.
+
+Runs each task against N simulated Cisco IOS switches serving recorded
+command output and, for the NetBox task, a local fake NetBox API::
+
+    python -m benchmarks.run_benchmarks --hosts 10 100 1000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import time
+from typing import Any, Callable, Dict, List
+from nornir.core import Nornir
+from nornir.core.inventory import Defaults, Groups, Host, Hosts, Inventory
+from nornir.plugins.runners import ThreadedRunner
+from benchmarks import simulated_devices
+from benchmarks.fake_netbox import FakeNetBox
+from src.instrumentation.timing import (
+    PhaseTimer,
+    TimingProcessor,
+    percentile,
+    set_active_timer,
+)
+
+SITES = [f"S{i:02d}" for i in range(20)]
+
+
+def build_nornir(num_hosts: int, num_workers: int) -> Nornir:
+    defaults = Defaults(username="bench", password="bench")
+    hosts = Hosts()
+    for i in range(num_hosts):
+        name = f"sim-sw{i:04d}"
+        hosts[name] = Host(
+            name=name,
+            hostname=f"10.{i // 65536}.{i // 256 % 256}.{i % 256}",
+            platform="cisco_ios",
+            data={
+                "site_id": SITES[i % len(SITES)],
+                "device_type": "9300L",
+                "function": "access_switch",
+            },
+            defaults=defaults,
+        )
+    inventory = Inventory(hosts=hosts, groups=Groups(), defaults=defaults)
+    return Nornir(inventory=inventory, runner=ThreadedRunner(num_workers=num_workers))
+
+
+def bounce_ports(nr: Nornir) -> list:
+    from src.tasks.bounce_ports_task import BouncePortsTask
+
+    return BouncePortsTask().propose(nr)
+
+
+def discovery(nr: Nornir) -> list:
+    from src.tasks.discovery_task import DiscoveryTask
+
+    return DiscoveryTask().propose(nr)
+
+
+def save_configs(nr: Nornir) -> list:
+    from src.tasks.save_configs_task import SaveConfigsTask
+
+    return SaveConfigsTask().apply(nr)
+
+
+def update_netbox(nr: Nornir) -> list:
+    from src.tasks.update_netbox_inventory import UpdateNetBoxInventoryTask
+
+    return UpdateNetBoxInventoryTask().apply(nr)
+
+
+SCENARIOS: Dict[str, Callable[[Nornir], list]] = {
+    "bounce_ports": bounce_ports,
+    "discovery": discovery,
+    "save_configs": save_configs,
+    "update_netbox": update_netbox,
+}
+
+
+def run_scenario(
+    name: str,
+    num_hosts: int,
+    num_workers: int,
+    connect_latency: float,
+    command_latency: float,
+) -> Dict[str, Any]:
+    simulated_devices.install(
+        connect_latency=connect_latency, command_latency=command_latency
+    )
+    timer = PhaseTimer()
+    set_active_timer(timer)
+    nr = build_nornir(num_hosts, num_workers)
+    nr = nr.with_processors([TimingProcessor(timer)])
+
+    start = time.perf_counter()
+    # The tasks print per-host progress; keep the report readable.
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows = SCENARIOS[name](nr)
+    elapsed = time.perf_counter() - start
+
+    host_times = list(timer.host_totals().values())
+    return {
+        "task": name,
+        "hosts": num_hosts,
+        "seconds": elapsed,
+        "hosts_per_second": num_hosts / elapsed if elapsed else 0.0,
+        "p50": percentile(host_times, 50),
+        "p95": percentile(host_times, 95),
+        "p99": percentile(host_times, 99),
+        "api_calls": sum(timer.counts.get("netbox_api_calls", {}).values()),
+        "rows": len(rows or []),
+        # ru_maxrss is reported in KiB on Linux.
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_isolated(*args: Any) -> Dict[str, Any]:
+    return run_isolated_call(run_scenario, *args)
+
+
+def run_isolated_call(fn: Callable[..., Dict[str, Any]], *args: Any) -> Dict[str, Any]:
+    # A fresh process per scenario keeps peak RSS and plugin state separate.
+    with multiprocessing.get_context("fork").Pool(1) as pool:
+        return pool.apply(fn, args)
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    header = (
+        f"{'task':<14}{'hosts':>7}{'seconds':>10}{'hosts/s':>10}"
+        f"{'p50':>8}{'p95':>8}{'p99':>8}{'api':>9}{'rss MB':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['task']:<14}{r['hosts']:>7}{r['seconds']:>10.2f}"
+            f"{r['hosts_per_second']:>10.1f}{r['p50']:>8.3f}{r['p95']:>8.3f}"
+            f"{r['p99']:>8.3f}{r['api_calls']:>9}{r['peak_rss_mb']:>9.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument(
+        "--tasks", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS)
+    )
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--connect-latency", type=float, default=0.05)
+    parser.add_argument("--command-latency", type=float, default=0.01)
+    parser.add_argument("--netbox-latency", type=float, default=0.0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    netbox = FakeNetBox(latency=args.netbox_latency).start()
+    os.environ["NETBOX_API_URL"] = netbox.url
+    os.environ["NETBOX_API_TOKEN"] = "0123456789abcdef0123456789abcdef01234567"
+
+    results = []
+    try:
+        for num_hosts in args.hosts:
+            for name in args.tasks:
+                netbox.reset(SITES)
+                results.append(
+                    run_isolated(
+                        name,
+                        num_hosts,
+                        args.workers,
+                        args.connect_latency,
+                        args.command_latency,
+                    )
+                )
+    finally:
+        netbox.stop()
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
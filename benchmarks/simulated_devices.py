@@ -0,0 +1,124 @@
+import os
+import time
+from typing import Any, Dict, List, Optional
+from nornir.core.configuration import Config
+from nornir.core.plugins.connections import ConnectionPluginRegister
+
+RECORDED_DIR = os.path.join(os.path.dirname(__file__), "recorded")
+
+
+def load_recorded(directory: str = RECORDED_DIR) -> Dict[str, str]:
+    """Map each command to its recorded output, one file per command named
+    after the command with spaces replaced by underscores."""
+    outputs = {}
+    for filename in os.listdir(directory):
+        if filename.endswith(".txt"):
+            with open(os.path.join(directory, filename)) as f:
+                outputs[filename[:-4].replace("_", " ")] = f.read()
+    return outputs
+
+
+class SimulatedDevice:
+    """Stands in for a netmiko ``BaseConnection`` to a Cisco IOS switch."""
+
+    def __init__(
+        self, hostname: str, outputs: Dict[str, str], command_latency: float
+    ) -> None:
+        self.hostname = hostname
+        self.outputs = outputs
+        self.command_latency = command_latency
+        self.alive = True
+
+    def send_command(self, command_string: str, **kwargs: Any) -> str:
+        time.sleep(self.command_latency)
+        return self.outputs.get(
+            command_string, "% Invalid input detected at '^' marker.\n"
+        )
+
+    send_command_timing = send_command
+
+    def send_config_set(
+        self, config_commands: Optional[List[str]] = None, **kwargs: Any
+    ) -> str:
+        config_commands = config_commands or []
+        time.sleep(self.command_latency * max(len(config_commands), 1))
+        lines = ["configure terminal"] + list(config_commands) + ["end"]
+        return "\n".join(f"{self.hostname}(config)#{line}" for line in lines)
+
+    def save_config(self, *args: Any, **kwargs: Any) -> str:
+        time.sleep(self.command_latency)
+        return "Building configuration...\n[OK]"
+
+    def enable(self) -> None:
+        pass
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+    def disconnect(self) -> None:
+        self.alive = False
+
+
+class SimulatedNetmiko:
+    """Connection plugin registered under ``netmiko`` in place of the real
+    one. Settings are class attributes because Nornir instantiates
+    connection plugins without arguments."""
+
+    outputs: Dict[str, str] = {}
+    connect_latency = 0.0
+    command_latency = 0.0
+
+    def open(
+        self,
+        hostname: Optional[str],
+        username: Optional[str],
+        password: Optional[str],
+        port: Optional[int],
+        platform: Optional[str],
+        extras: Optional[Dict[str, Any]] = None,
+        configuration: Optional[Config] = None,
+    ) -> None:
+        time.sleep(self.connect_latency)
+        self.connection = SimulatedDevice(hostname, self.outputs, self.command_latency)
+
+    def close(self) -> None:
+        self.connection.disconnect()
+
+
+class SimulatedNapalm(SimulatedNetmiko):
+    """Connection plugin registered under ``napalm``: a real NAPALM IOS
+    driver whose CLI is a ``SimulatedDevice``, so getters parse the
+    recorded output with NAPALM's own code."""
+
+    def open(
+        self,
+        hostname: Optional[str],
+        username: Optional[str],
+        password: Optional[str],
+        port: Optional[int],
+        platform: Optional[str],
+        extras: Optional[Dict[str, Any]] = None,
+        configuration: Optional[Config] = None,
+    ) -> None:
+        from napalm.ios.ios import IOSDriver
+
+        time.sleep(self.connect_latency)
+        self.connection = IOSDriver(hostname, username, password)
+        self.connection.device = SimulatedDevice(
+            hostname, self.outputs, self.command_latency
+        )
+
+    def close(self) -> None:
+        self.connection.device.disconnect()
+
+
+def install(
+    outputs: Optional[Dict[str, str]] = None,
+    connect_latency: float = 0.0,
+    command_latency: float = 0.0,
+) -> None:
+    SimulatedNetmiko.outputs = outputs if outputs is not None else load_recorded()
+    SimulatedNetmiko.connect_latency = connect_latency
+    SimulatedNetmiko.command_latency = command_latency
+    ConnectionPluginRegister.available["netmiko"] = SimulatedNetmiko
+    ConnectionPluginRegister.available["napalm"] = SimulatedNapalm
@@ -0,0 +1,29 @@
+import os
+from src.core.job_queue import JobQueueWorker, MongoJobQueue
+from src.inventory.csv_inventory import CSVInventory
+from src.tasks.bounce_ports_task import BouncePortsTask
+from src.tasks.save_configs_task import SaveConfigsTask
+from src.tasks.update_netbox_inventory import UpdateNetBoxInventoryTask
+
+
+def main() -> None:
+    config_path = os.path.join("config", "config.yaml")
+
+    inventory_source = CSVInventory(config_path)
+
+    job_queue = MongoJobQueue(
+        uri=os.getenv("JOB_QUEUE_MONGO_URI", "mongodb://localhost:27017"),
+        db_name="net_task_processor",
+    )
+
+    tasks = [BouncePortsTask(), SaveConfigsTask(), UpdateNetBoxInventoryTask()]
+    worker = JobQueueWorker(
+        job_queue=job_queue,
+        inventory_source=inventory_source,
+        tasks={type(task).__name__: task for task in tasks},
+    )
+    worker.run_forever()
+
+
+if __name__ == "__main__":
+    main()
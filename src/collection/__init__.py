@@ -0,0 +1,3 @@
+from .backends import CliBackend, CollectionBackend, NapalmBackend
+
+__all__ = ["CliBackend", "CollectionBackend", "NapalmBackend"]
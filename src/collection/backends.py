@@ -0,0 +1,175 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List
+from netutils.interface import abbreviated_interface_name, canonical_interface_name
+from netutils.mac import is_valid_mac, mac_to_format
+from nornir.core.task import Task
+from nornir_napalm.plugins.tasks import napalm_get
+from src.instrumentation.timing import active_timer
+from src.resilience.retry import active_retry_policy
+
+
+class CollectionBackend(ABC):
+    """Structured device data, however it is collected.
+
+    Every backend returns the same shapes, those of the ntc-templates
+    parsers the tasks were written against:
+
+    * ``interfaces``: ``{interface: {"interface", "description",
+      "mac_address", "ip_address", "prefix_length", "link_status"}}``
+    * ``vlans``: ``{vlan_id: [abbreviated interface names]}``
+    * ``vrfs``: ``{canonical interface name: vrf}`` for non-default VRFs
+    * ``facts``: ``[{"hardware": [...], "serial": [...], "mac_address":
+      [...], "version", "hostname"}]``, one list entry per stack member;
+      ``mac_address`` is left out when the backend cannot report it
+    """
+
+    name = ""
+
+    @abstractmethod
+    def interfaces(self, task: Task) -> Dict[str, Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def vlans(self, task: Task) -> Dict[str, List[str]]:
+        pass
+
+    @abstractmethod
+    def vrfs(self, task: Task) -> Dict[str, str]:
+        pass
+
+    @abstractmethod
+    def facts(self, task: Task) -> List[Dict[str, Any]]:
+        pass
+
+
+class CliBackend(CollectionBackend):
+    """Show commands through the owning task's ``send_command``, parsed
+    with TextFSM, so recording, replay, retries and the parse cache apply."""
+
+    name = "cli"
+
+    def __init__(self, owner: Any, platform: str = "cisco_ios") -> None:
+        self.owner = owner
+        self.platform = platform
+
+    def output(self, task: Task, command: str) -> str:
+        return self.owner.send_command(task, command).result
+
+    def parse(self, command: str, output: str) -> Any:
+        return self.owner.parse_output(
+            platform=self.platform, command=command, data=output
+        )
+
+    def interfaces(self, task: Task) -> Dict[str, Dict[str, Any]]:
+        return self.parse_interfaces(self.output(task, "show interface"))
+
+    def parse_interfaces(self, output: str) -> Dict[str, Dict[str, Any]]:
+        return {
+            entry["interface"]: entry for entry in self.parse("show interface", output)
+        }
+
+    def vlans(self, task: Task) -> Dict[str, List[str]]:
+        return self.parse_vlans(self.output(task, "show vlan brief"))
+
+    def parse_vlans(self, output: str) -> Dict[str, List[str]]:
+        return {
+            entry["vlan_id"]: entry["interfaces"]
+            for entry in self.parse("show vlan brief", output)
+        }
+
+    def vrfs(self, task: Task) -> Dict[str, str]:
+        return self.parse_vrfs(self.output(task, "show vrf"))
+
+    def parse_vrfs(self, output: str) -> Dict[str, str]:
+        return {
+            canonical_interface_name(interface): entry["name"]
+            for entry in self.parse("show vrf", output)
+            for interface in entry["interfaces"]
+        }
+
+    def facts(self, task: Task) -> List[Dict[str, Any]]:
+        return self.parse_facts(self.output(task, "show version"))
+
+    def parse_facts(self, output: str) -> List[Dict[str, Any]]:
+        return self.parse("show version", output)
+
+
+class NapalmBackend(CollectionBackend):
+    """NAPALM getters over the host's ``napalm`` connection. The driver
+    does its own parsing, so nothing goes through TextFSM here.
+
+    NAPALM facts report one model and serial per device, so a stack
+    appears as its active member only and without a MAC address.
+    """
+
+    name = "napalm"
+
+    def get(self, task: Task, getters: List[str]) -> Dict[str, Any]:
+        policy = active_retry_policy()
+        if policy is None:
+            with active_timer().phase("command", task.host.name):
+                return task.run(task=napalm_get, getters=getters).result
+        # napalm_get connects on first use, so the host and site breakers
+        # guard it as they do the CLI's send_command.
+        keys = policy.host_keys(task.host)
+        policy.check(keys)
+        try:
+            with active_timer().phase("command", task.host.name):
+                result = task.run(task=napalm_get, getters=getters).result
+        except Exception as e:
+            policy.record(keys, str(e) or type(e).__name__)
+            raise
+        policy.record(keys)
+        return result
+
+    def interfaces(self, task: Task) -> Dict[str, Dict[str, Any]]:
+        data = self.get(task, ["interfaces", "interfaces_ip"])
+        interfaces = {}
+        for name, details in data["interfaces"].items():
+            ipv4 = data["interfaces_ip"].get(name, {}).get("ipv4", {})
+            address, prefix = next(iter(ipv4.items()), ("", {}))
+            interfaces[name] = {
+                "interface": name,
+                "description": details["description"],
+                "mac_address": self.cli_mac(details["mac_address"]),
+                "ip_address": address,
+                "prefix_length": str(prefix.get("prefix_length", "")),
+                "link_status": "up" if details["is_up"] else "down",
+            }
+        return interfaces
+
+    @staticmethod
+    def cli_mac(mac: str) -> str:
+        """NAPALM gives ``00:A7:42:C1:00:15``; IOS prints ``00a7.42c1.0015``."""
+        if not mac or not is_valid_mac(mac):
+            return mac
+        return mac_to_format(mac, "MAC_DOT_FOUR").lower()
+
+    def vlans(self, task: Task) -> Dict[str, List[str]]:
+        return {
+            str(vlan_id): [
+                abbreviated_interface_name(interface)
+                for interface in vlan["interfaces"]
+            ]
+            for vlan_id, vlan in self.get(task, ["vlans"])["vlans"].items()
+        }
+
+    def vrfs(self, task: Task) -> Dict[str, str]:
+        instances = self.get(task, ["network_instances"])["network_instances"]
+        return {
+            canonical_interface_name(interface): name
+            for name, instance in instances.items()
+            if instance["type"] != "DEFAULT_INSTANCE"
+            for interface in instance["interfaces"]["interface"]
+        }
+
+    def facts(self, task: Task) -> List[Dict[str, Any]]:
+        facts = self.get(task, ["facts"])["facts"]
+        return [
+            {
+                "hardware": [facts["model"]],
+                "serial": [facts["serial_number"]],
+                "version": facts["os_version"],
+                "hostname": facts["hostname"],
+            }
+        ]
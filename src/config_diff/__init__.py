@@ -0,0 +1,3 @@
+from .config_tree import ConfigNode, ConfigTree, normalize_line
+
+__all__ = ["ConfigNode", "ConfigTree", "normalize_line"]
@@ -0,0 +1,97 @@
+import re
+from typing import Dict, Iterable, List, Optional
+from netutils.interface import canonical_interface_name
+
+
+def normalize_line(line: str) -> str:
+    line = " ".join(line.split())
+    if line.startswith("interface "):
+        return f"interface {canonical_interface_name(line[len('interface '):])}"
+    return line
+
+
+class ConfigNode:
+    __slots__ = ("line", "children")
+
+    def __init__(self, line: str) -> None:
+        self.line = line
+        self.children: Dict[str, "ConfigNode"] = {}
+
+    def add(self, line: str) -> "ConfigNode":
+        key = normalize_line(line)
+        node = self.children.get(key)
+        if node is None:
+            node = self.children[key] = ConfigNode(line)
+        return node
+
+    def get(self, line: str) -> Optional["ConfigNode"]:
+        return self.children.get(normalize_line(line))
+
+    def satisfies(self, line: str) -> bool:
+        """Whether ``line`` is already in effect directly under this node.
+
+        ``no <command>`` holds when nothing under the node starts with
+        ``<command>``; IOS does not keep negated lines for most commands.
+        """
+        key = normalize_line(line)
+        if key in self.children:
+            return True
+        if key.startswith("no "):
+            negated = key[3:]
+            return not any(
+                child == negated or child.startswith(f"{negated} ")
+                for child in self.children
+            )
+        return False
+
+
+class ConfigTree:
+    """Indentation-based tree of an IOS-style configuration.
+
+    Each section's children are indexed by normalized line, so membership
+    checks during a diff are dictionary lookups rather than text scans.
+    """
+
+    COMMENT = re.compile(r"^\s*(!|$)")
+
+    def __init__(self) -> None:
+        self.root = ConfigNode("")
+
+    @classmethod
+    def parse(cls, lines: Iterable[str]) -> "ConfigTree":
+        tree = cls()
+        stack: List[tuple] = [(-1, tree.root)]
+        for line in lines:
+            if cls.COMMENT.match(line):
+                continue
+            indent = len(line) - len(line.lstrip(" "))
+            while stack[-1][0] >= indent:
+                stack.pop()
+            node = stack[-1][1].add(line.rstrip())
+            stack.append((indent, node))
+        return tree
+
+    @classmethod
+    def from_config(cls, config: str) -> "ConfigTree":
+        return cls.parse(config.splitlines())
+
+    def delta(self, commands: List[str]) -> List[str]:
+        """Return the subset of ``commands`` not already in the config, with
+        each missing line preceded by the section lines that lead to it."""
+        candidate = ConfigTree.parse(commands)
+        return self.section_delta(self.root, candidate.root)
+
+    def section_delta(
+        self, running: Optional[ConfigNode], candidate: ConfigNode
+    ) -> List[str]:
+        delta = []
+        for key, node in candidate.children.items():
+            existing = running.children.get(key) if running else None
+            if node.children:
+                child_delta = self.section_delta(existing, node)
+                if child_delta or existing is None:
+                    delta.append(node.line)
+                    delta.extend(child_delta)
+            elif running is None or not running.satisfies(node.line):
+                delta.append(node.line)
+        return delta
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import asyncssh
+from nornir.core import Nornir
+from nornir.core.inventory import Host
+from src.instrumentation.timing import RUN, active_timer, set_current_host
+from src.recording.command_store import ReplayMissError, active_recorder
+from src.resilience.retry import CircuitOpenError, active_retry_policy
+
+# A device prompt such as "sw01#" or "sw01>" at the end of the output.
+PROMPT = re.compile(r"([\w.\-@/:]+)[>#]\s*$")
+
+
+class AsyncCollectionEngine:
+    """Runs the command-collect-parse half of read-only tasks on asyncio.
+
+    A task opts in by defining ``collection_commands`` and
+    ``process_collected(host, outputs)``; the latter is the same parsing
+    step its Nornir task calls, so ``collect_results`` returns the same data
+    whichever engine collected it. Concurrency is bounded by a semaphore
+    instead of a thread per host.
+
+    Each host's commands run one after another in a single interactive
+    shell, as netmiko does, because many network devices accept only one
+    channel per SSH session. ``channel_concurrency`` above 1 instead runs
+    each command on its own exec channel, that many at a time, for
+    platforms known to allow it.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 1000,
+        connect_timeout: float = 10.0,
+        command_timeout: float = 60.0,
+        connection: str = "netmiko",
+        channel_concurrency: int = 1,
+        parse_workers: Optional[int] = None,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.connect_timeout = connect_timeout
+        self.command_timeout = command_timeout
+        self.connection = connection
+        self.channel_concurrency = channel_concurrency
+        self.parse_workers = parse_workers
+        self.parse_executor: Optional[ThreadPoolExecutor] = None
+        self.failed: Dict[str, str] = {}
+
+    @staticmethod
+    def supports(task: Any) -> bool:
+        return hasattr(task, "collection_commands") and hasattr(
+            task, "process_collected"
+        )
+
+    async def run_commands(self, host: Host, commands: List[str]) -> Dict[str, str]:
+        params = host.get_connection_parameters(self.connection)
+        timer = active_timer()
+        with timer.phase("connect", host.name):
+            conn = await asyncssh.connect(
+                params.hostname,
+                port=params.port or 22,
+                username=params.username,
+                password=params.password,
+                known_hosts=None,
+                connect_timeout=self.connect_timeout,
+            )
+        async with conn:
+            if self.channel_concurrency > 1:
+                return await self.run_exec_channels(conn, host, commands)
+            return await self.run_shell(conn, host, commands)
+
+    async def run_shell(
+        self, conn: asyncssh.SSHClientConnection, host: Host, commands: List[str]
+    ) -> Dict[str, str]:
+        timer = active_timer()
+        process = await conn.create_process(term_type="vt100")
+        try:
+            prompt = await self.find_prompt(process)
+            await self.send_shell_command(process, prompt, "terminal length 0")
+            outputs = {}
+            for command in commands:
+                with timer.phase("command", host.name):
+                    outputs[command] = await self.send_shell_command(
+                        process, prompt, command
+                    )
+            return outputs
+        finally:
+            process.close()
+
+    async def find_prompt(self, process: asyncssh.SSHClientProcess) -> re.Pattern:
+        process.stdin.write("\n")
+        output = await self.read_until(process, PROMPT)
+        name = PROMPT.search(output).group(1)
+        return re.compile(rf"{re.escape(name)}(\(config[^)]*\))?[>#]\s*$")
+
+    async def send_shell_command(
+        self, process: asyncssh.SSHClientProcess, prompt: re.Pattern, command: str
+    ) -> str:
+        process.stdin.write(f"{command}\n")
+        # Anything before the echoed command, such as a second prompt from
+        # find_prompt's newline, belongs to the previous exchange.
+        output = await self.read_until(process, prompt, after=command)
+        lines = output.replace("\r", "").split("\n")
+        # Drop the rest of the echo line and the trailing prompt.
+        return "\n".join(lines[1:-1])
+
+    async def read_until(
+        self,
+        process: asyncssh.SSHClientProcess,
+        pattern: re.Pattern,
+        after: str = "",
+    ) -> str:
+        """Read until ``pattern`` matches the output following the first
+        ``after``; returns that output."""
+        buffer = ""
+        deadline = time.monotonic() + self.command_timeout
+        while True:
+            start = buffer.find(after)
+            if start != -1:
+                output = buffer[start + len(after) :]
+                if pattern.search(output):
+                    return output
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            chunk = await asyncio.wait_for(process.stdout.read(65536), remaining)
+            if not chunk:
+                raise asyncssh.ConnectionLost("Shell closed before the prompt")
+            buffer += chunk
+
+    async def run_exec_channels(
+        self, conn: asyncssh.SSHClientConnection, host: Host, commands: List[str]
+    ) -> Dict[str, str]:
+        timer = active_timer()
+        channels = asyncio.Semaphore(self.channel_concurrency)
+
+        async def run(command: str) -> str:
+            async with channels:
+                with timer.phase("command", host.name):
+                    result = await asyncio.wait_for(
+                        conn.run(command, check=False), self.command_timeout
+                    )
+            return result.stdout
+
+        outputs = await asyncio.gather(*(run(command) for command in commands))
+        return dict(zip(commands, outputs))
+
+    async def guarded_run_commands(
+        self, host: Host, commands: List[str]
+    ) -> Dict[str, str]:
+        """``run_commands`` behind the run's host and site circuit breakers,
+        so an open breaker stops this path connecting too."""
+        policy = active_retry_policy()
+        if policy is None:
+            return await self.run_commands(host, commands)
+        keys = policy.host_keys(host)
+        policy.check(keys)
+        try:
+            outputs = await self.run_commands(host, commands)
+        except (OSError, asyncssh.Error, asyncio.TimeoutError) as e:
+            policy.record(keys, str(e) or type(e).__name__)
+            raise
+        policy.record(keys)
+        return outputs
+
+    async def collect_host(
+        self, host: Host, task: Any, semaphore: asyncio.Semaphore
+    ) -> None:
+        recorder = active_recorder()
+        async with semaphore:
+            try:
+                if recorder and recorder.replaying:
+                    outputs = recorder.replay_outputs(
+                        host.name, task.collection_commands
+                    )
+                else:
+                    outputs = await self.guarded_run_commands(
+                        host, task.collection_commands
+                    )
+            except (
+                OSError,
+                asyncssh.Error,
+                asyncio.TimeoutError,
+                ReplayMissError,
+                CircuitOpenError,
+            ) as e:
+                self.failed[host.name] = str(e) or type(e).__name__
+                logging.error(f"Collection failed on {host.name}: {e}")
+                return
+        if recorder:
+            for command, output in outputs.items():
+                recorder.record(host.name, command, output)
+        # TextFSM parsing is CPU-bound; on the loop it would stall every
+        # other host's reads, so it runs on the parse pool instead.
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self.parse_executor, self.parse_host, task, host, outputs
+            )
+        except Exception as e:
+            self.failed[host.name] = str(e)
+            logging.error(f"Parsing failed on {host.name}: {e}")
+
+    @staticmethod
+    def parse_host(task: Any, host: Host, outputs: Dict[str, str]) -> None:
+        # Runs in a pool thread, so the thread-local host label is set here.
+        set_current_host(host.name)
+        try:
+            task.process_collected(host, outputs)
+        finally:
+            set_current_host(RUN)
+
+    async def collect_all(self, nr: Nornir, task: Any) -> None:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.parse_executor = ThreadPoolExecutor(
+            max_workers=self.parse_workers, thread_name_prefix="parse"
+        )
+        try:
+            await asyncio.gather(
+                *(
+                    self.collect_host(host, task, semaphore)
+                    for host in nr.inventory.hosts.values()
+                )
+            )
+        finally:
+            self.parse_executor.shutdown()
+            self.parse_executor = None
+
+    def collect(self, nr: Nornir, task: Any) -> None:
+        self.failed = {}
+        start = time.perf_counter()
+        asyncio.run(self.collect_all(nr, task))
+        logging.info(
+            f"Collected {len(nr.inventory.hosts) - len(self.failed)} of "
+            f"{len(nr.inventory.hosts)} hosts in {time.perf_counter() - start:.2f}s"
+        )
+
+    def propose(self, nr: Nornir, task: Any) -> List[Dict[str, Any]]:
+        self.collect(nr, task)
+        if hasattr(task, "print_proposed_configuration"):
+            task.print_proposed_configuration(nr)
+        return task.collect_results(nr)
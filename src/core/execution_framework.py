@@ -1,11 +1,28 @@
+import logging
+import os
 from nornir.core import Nornir
 from nornir_utils.plugins.functions import print_result
-from typing import List, Optional, Dict, Any, Type, Literal
+from typing import List, Optional, Dict, Any, Type, Literal, Union
 import yaml
 from src.inventory.base_inventory import BaseInventory
 from src.filters.base_filter import BaseFilter
 from src.tasks.base_task import BaseTask
 from src.core.post_processing.base_post_processor import BasePostProcessor
+from src.core.sharded_runner import ShardedRunner
+from src.core.job_queue import MongoJobQueue
+from src.core.async_engine import AsyncCollectionEngine
+from src.core.preflight import UNREACHABLE, ReachabilitySweep
+from src.core.prewarm import CONNECT_FAILED, SessionPrewarmer
+from src.instrumentation.profiling import RunProfiler
+from src.instrumentation.timing import PhaseTimer, TimingProcessor, set_active_timer
+from src.results.result_table import ResultTable
+from src.resilience.rate_limit import format_rate, rate_limiters
+from src.resilience.retry import RetryPolicy, set_active_retry_policy
+from src.recording.command_store import (
+    CommandRecorder,
+    FileCommandStore,
+    set_active_recorder,
+)
 
 
 class ExecutionFramework:
@@ -17,6 +34,15 @@ class ExecutionFramework:
         filter_obj: Optional[Type[BaseFilter]],
         execution_mode: Literal["proposal", "apply"] = None,
         post_processors: Optional[List[Type[BasePostProcessor]]] = None,
+        num_processes: int = 1,
+        shard_by: str = "name",
+        async_engine: Optional[AsyncCollectionEngine] = None,
+        timing_dir: Optional[str] = None,
+        profile_dir: Optional[str] = None,
+        recorder: Optional[CommandRecorder] = None,
+        preflight: Optional[ReachabilitySweep] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        prewarmer: Optional[SessionPrewarmer] = None,
     ) -> None:
         self.inventory_source = inventory_source
         self.filter_obj = filter_obj
@@ -24,21 +50,176 @@ class ExecutionFramework:
         self.post_processors = post_processors if post_processors else []
         self.config = self.load_config(config_file)
         self.execution_mode = execution_mode
+        self.num_processes = num_processes
+        self.shard_by = shard_by
+        self.async_engine = async_engine
+        self.timing_dir = timing_dir
+        self.timer = PhaseTimer()
+        self.profile_dir = profile_dir or os.getenv("NET_TASK_PROFILE_DIR")
+        self.recorder = recorder or self.recorder_from_env()
+        self.preflight = preflight
+        self.unreachable: Dict[str, str] = {}
+        self.retry_policy = retry_policy
+        self.prewarmer = prewarmer
+        self.connect_failed: Dict[str, str] = {}
+
+    @staticmethod
+    def recorder_from_env() -> Optional[CommandRecorder]:
+        if os.getenv("NET_TASK_REPLAY_DIR"):
+            return CommandRecorder(
+                FileCommandStore(os.getenv("NET_TASK_REPLAY_DIR")), "replay"
+            )
+        if os.getenv("NET_TASK_RECORD_DIR"):
+            return CommandRecorder(
+                FileCommandStore(os.getenv("NET_TASK_RECORD_DIR")), "record"
+            )
+        return None
 
     def load_config(self, config_file: str) -> Dict[str, Any]:
         with open(config_file, "r") as f:
             return yaml.safe_load(f)
 
-    def execute(self) -> None:
+    def execute(self, nr: Optional[Nornir] = None) -> List[Dict[str, Any]]:
+        if self.profile_dir:
+            with RunProfiler(self.profile_dir):
+                return self.execute_run(nr)
+        return self.execute_run(nr)
+
+    def execute_run(self, nr: Optional[Nornir] = None) -> List[Dict[str, Any]]:
+        self.timer = PhaseTimer()
+        set_active_timer(self.timer)
+        set_active_recorder(self.recorder)
+        if self.retry_policy:
+            self.retry_policy.reset()
+        set_active_retry_policy(self.retry_policy)
+        if nr is None:
+            with self.timer.phase("inventory"):
+                nr = self.inventory_source.get_inventory()
+        if self.filter_obj:
+            with self.timer.phase("filter"):
+                nr = self.filter_obj.apply(nr)
+        self.unreachable = {}
+        self.connect_failed = {}
+        if self.preflight:
+            with self.timer.phase("preflight"):
+                nr, self.unreachable = self.preflight.filter(nr)
+        if self.prewarmer and self.uses_nornir_sessions():
+            with self.timer.phase("prewarm"):
+                nr, self.connect_failed = self.prewarmer.filter(nr)
+        nr = nr.with_processors([*nr.processors, TimingProcessor(self.timer)])
+        with self.timer.phase("execution"):
+            result = self.run_task(nr)
+        if self.unreachable or self.connect_failed:
+            result = self.add_failed_hosts(result)
+        print_result(result)
+        with self.timer.phase("post_processing"):
+            self.run_post_processors(result)
+        self.report_timing()
+        return result
+
+    def run_task(self, nr: Nornir) -> List[Dict[str, Any]]:
+        if self.num_processes > 1:
+            return ShardedRunner(
+                inventory_source=self.inventory_source,
+                task=self.task,
+                execution_mode=self.execution_mode,
+                num_processes=self.num_processes,
+                shard_by=self.shard_by,
+            ).run(nr)
+        elif (
+            self.execution_mode == "proposal"
+            and self.async_engine
+            and self.async_engine.supports(self.task)
+        ):
+            return self.async_engine.propose(nr, self.task)
+        elif self.execution_mode == "proposal":
+            return self.task.propose(nr)
+        elif self.execution_mode == "apply":
+            return self.task.apply(nr)
+
+    def uses_nornir_sessions(self) -> bool:
+        # Shard workers and the async engine open their own connections, and
+        # replayed runs open none, so there is nothing to pre-warm for them.
+        if self.num_processes > 1 or (self.recorder and self.recorder.replaying):
+            return False
+        return not (
+            self.execution_mode == "proposal"
+            and self.async_engine
+            and self.async_engine.supports(self.task)
+        )
+
+    def add_failed_hosts(
+        self, result: Union[List[Dict[str, Any]], ResultTable, None]
+    ) -> Union[List[Dict[str, Any]], ResultTable]:
+        failed = [
+            {"host": name, "status": "failed", "error": error, "detail": reason}
+            for error, hosts in (
+                (UNREACHABLE, self.unreachable),
+                (CONNECT_FAILED, self.connect_failed),
+            )
+            for name, reason in hosts.items()
+        ]
+        if isinstance(result, ResultTable):
+            return ResultTable.concat([result, ResultTable.from_records(failed)])
+        return [*(result or []), *failed]
+
+    def report_timing(self) -> None:
+        summary = self.timer.summary()
+        for phase, stats in summary["phases"].items():
+            if not stats["hosts"]:
+                logging.info(f"{phase}: {stats['total']:.2f}s")
+                continue
+            logging.info(
+                f"{phase}: total {stats['total']:.2f}s over {stats['hosts']} hosts, "
+                f"p50 {stats['p50']:.2f}s, p95 {stats['p95']:.2f}s, "
+                f"p99 {stats['p99']:.2f}s"
+            )
+        for name, count in summary["counts"].items():
+            logging.info(f"{name}: {count}")
+        if summary["slowest_hosts"]:
+            logging.info(f"Slowest hosts: {summary['slowest_hosts']}")
+        if self.retry_policy:
+            retries = self.retry_policy.summary()
+            logging.info(
+                f"Retries used: {retries['retries_used']} of {retries['retry_budget']}"
+            )
+            for key, error in retries["open_circuits"].items():
+                logging.warning(f"Circuit open for {key}: {error}")
+        for api, limiter in rate_limiters().items():
+            limits = limiter.summary()
+            logging.info(
+                f"{api} rate limiter: throttled "
+                f"{sum(limits['throttled_seconds'].values()):.2f}s over "
+                f"{sum(limits['throttled_calls'].values())} calls, "
+                f"{limits['rate_limited_responses']} rate-limited responses, "
+                f"read {format_rate(limits['rates']['read'])}, "
+                f"write {format_rate(limits['rates']['write'])}"
+            )
+        if self.timing_dir:
+            os.makedirs(self.timing_dir, exist_ok=True)
+            self.timer.export_json(os.path.join(self.timing_dir, "timing.json"))
+            self.timer.export_prometheus(os.path.join(self.timing_dir, "timing.prom"))
+
+    def execute_distributed(
+        self,
+        job_queue: MongoJobQueue,
+        split_by: str = "name",
+        timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
         nr: Nornir = self.inventory_source.get_inventory()
         if self.filter_obj:
             nr = self.filter_obj.apply(nr)
-        if self.execution_mode == "proposal":
-            result = self.task.propose(nr)
-        elif self.execution_mode == "apply":
-            result = self.task.apply(nr)
+        work_items: Dict[str, List[str]] = {}
+        for host in nr.inventory.hosts.values():
+            key = host.name if split_by == "name" else str(host.get(split_by))
+            work_items.setdefault(key, []).append(host.name)
+        run_id = job_queue.enqueue(
+            type(self.task).__name__, self.execution_mode, work_items
+        )
+        result = job_queue.wait(run_id, timeout=timeout)
         print_result(result)
         self.run_post_processors(result)
+        return result
 
     def propose_inventory(self) -> None:
         nr: Nornir = self.inventory_source.get_inventory()
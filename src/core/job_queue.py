@@ -0,0 +1,241 @@
+import logging
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Type
+import pymongo
+from pymongo import ReturnDocument
+from nornir.core import Nornir
+from src.core.run_state import RunState
+from src.inventory.base_inventory import BaseInventory
+from src.tasks.base_task import BaseTask
+from src.results.result_table import to_records
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class MongoJobQueue:
+    """Work items for a run, claimed by workers under a time-limited lease.
+
+    A claim is a single ``find_one_and_update``, so two workers can never
+    hold the same item. Items whose lease expires without completion are
+    claimable again, up to ``max_attempts``.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        db_name: str,
+        collection_name: str = "job_queue",
+        lease_seconds: float = 300.0,
+        max_attempts: int = 3,
+    ) -> None:
+        self.client = pymongo.MongoClient(uri, tz_aware=True)
+        self.db = self.client[db_name]
+        self.collection = self.db[collection_name]
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.collection.create_index([("status", 1), ("lease_expires", 1)])
+        self.collection.create_index([("run_id", 1), ("status", 1)])
+
+    def enqueue(
+        self, task_name: str, execution_mode: str, work_items: Dict[str, List[str]]
+    ) -> str:
+        run_id = uuid.uuid4().hex
+        now = utcnow()
+        documents = [
+            {
+                "run_id": run_id,
+                "key": key,
+                "hosts": hosts,
+                "task": task_name,
+                "mode": execution_mode,
+                "status": QUEUED,
+                "attempts": 0,
+                "worker": None,
+                "lease_expires": None,
+                "created": now,
+                "result": None,
+                "error": None,
+            }
+            for key, hosts in work_items.items()
+        ]
+        if documents:
+            self.collection.insert_many(documents)
+        logging.info(f"Queued {len(documents)} work items for run {run_id}")
+        return run_id
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        now = utcnow()
+        return self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": QUEUED},
+                    {"status": RUNNING, "lease_expires": {"$lt": now}},
+                ],
+                "attempts": {"$lt": self.max_attempts},
+            },
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "worker": worker_id,
+                    "lease_expires": now + timedelta(seconds=self.lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def extend_lease(self, item_id: Any, worker_id: str) -> bool:
+        result = self.collection.update_one(
+            {"_id": item_id, "worker": worker_id, "status": RUNNING},
+            {
+                "$set": {
+                    "lease_expires": utcnow() + timedelta(seconds=self.lease_seconds)
+                }
+            },
+        )
+        return result.modified_count == 1
+
+    def complete(
+        self, item_id: Any, worker_id: str, result: List[Dict[str, Any]]
+    ) -> bool:
+        update = self.collection.update_one(
+            {"_id": item_id, "worker": worker_id, "status": RUNNING},
+            {"$set": {"status": DONE, "result": result, "finished": utcnow()}},
+        )
+        return update.modified_count == 1
+
+    def fail(self, item_id: Any, worker_id: str, error: str) -> None:
+        item = self.collection.find_one({"_id": item_id, "worker": worker_id})
+        if item is None:
+            return
+        status = FAILED if item["attempts"] >= self.max_attempts else QUEUED
+        self.collection.update_one(
+            {"_id": item_id, "worker": worker_id, "status": RUNNING},
+            {"$set": {"status": status, "error": error, "lease_expires": None}},
+        )
+
+    def requeue_expired(self) -> int:
+        now = utcnow()
+        expired = {"status": RUNNING, "lease_expires": {"$lt": now}}
+        exhausted = self.collection.update_many(
+            {**expired, "attempts": {"$gte": self.max_attempts}},
+            {"$set": {"status": FAILED, "error": "lease expired"}},
+        )
+        requeued = self.collection.update_many(
+            expired, {"$set": {"status": QUEUED, "worker": None}}
+        )
+        if exhausted.modified_count:
+            logging.warning(
+                f"{exhausted.modified_count} work items failed after "
+                f"{self.max_attempts} expired leases"
+            )
+        return requeued.modified_count
+
+    def outstanding(self, run_id: str) -> int:
+        return self.collection.count_documents(
+            {"run_id": run_id, "status": {"$in": [QUEUED, RUNNING]}}
+        )
+
+    def wait(
+        self, run_id: str, poll_interval: float = 2.0, timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.outstanding(run_id):
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Run {run_id} did not finish in {timeout}s")
+            self.requeue_expired()
+            time.sleep(poll_interval)
+        return self.results(run_id)
+
+    def results(self, run_id: str) -> List[Dict[str, Any]]:
+        data = []
+        for item in self.collection.find({"run_id": run_id}).sort("key", 1):
+            if item["status"] == DONE:
+                data.extend(item["result"] or [])
+            else:
+                data.extend(
+                    {"host": host, "status": item["status"], "error": item["error"]}
+                    for host in item["hosts"]
+                )
+        return data
+
+
+class JobQueueWorker:
+    def __init__(
+        self,
+        job_queue: MongoJobQueue,
+        inventory_source: Type[BaseInventory],
+        tasks: Dict[str, Type[BaseTask]],
+        worker_id: Optional[str] = None,
+    ) -> None:
+        self.job_queue = job_queue
+        self.inventory_source = inventory_source
+        self.tasks = tasks
+        self.worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.nr: Optional[Nornir] = None
+        self.run_state: Optional[RunState] = None
+        self.running = False
+
+    def run_item(self, item: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if self.nr is None:
+            self.nr = self.inventory_source.get_inventory()
+            self.run_state = RunState(self.nr)
+        self.run_state.reset()
+        names = set(item["hosts"])
+        nr = self.nr.filter(filter_func=lambda host: host.name in names)
+        task = self.tasks[item["task"]]
+        if item["mode"] == "proposal":
+            return task.propose(nr)
+        elif item["mode"] == "apply":
+            return task.apply(nr)
+        raise ValueError(f"Unknown execution mode {item['mode']}")
+
+    def keep_lease(self, item: Dict[str, Any], done: threading.Event) -> None:
+        while not done.wait(self.job_queue.lease_seconds / 3):
+            if not self.job_queue.extend_lease(item["_id"], self.worker_id):
+                logging.warning(f"Lost lease on work item {item['key']}")
+                return
+
+    def process_one(self) -> bool:
+        item = self.job_queue.claim(self.worker_id)
+        if item is None:
+            return False
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self.keep_lease, args=(item, done))
+        heartbeat.start()
+        try:
+            result = to_records(self.run_item(item))
+        except Exception as e:
+            logging.error(f"Work item {item['key']} failed: {e}")
+            self.job_queue.fail(item["_id"], self.worker_id, str(e))
+        else:
+            if not self.job_queue.complete(item["_id"], self.worker_id, result):
+                logging.warning(
+                    f"Work item {item['key']} was reclaimed before it completed"
+                )
+        finally:
+            done.set()
+            heartbeat.join()
+        return True
+
+    def run_forever(self, idle_interval: float = 2.0) -> None:
+        self.running = True
+        logging.info(f"Job queue worker {self.worker_id} started")
+        while self.running:
+            if not self.process_one():
+                time.sleep(idle_interval)
+
+    def stop(self) -> None:
+        self.running = False
@@ -2,11 +2,12 @@
 
 import pynetbox
 import os
+from src.instrumentation.timing import instrument_api
 
 
 class NetBoxHandler:
     def __init__(self, api_url, token):
-        self.nb: pynetbox.api = pynetbox.api(api_url, token=token)
+        self.nb: pynetbox.api = instrument_api(pynetbox.api(api_url, token=token))
 
     def create_device(self, name, site, device_type, role="Access Switch"):
         device_data = {
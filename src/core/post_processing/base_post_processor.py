@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Union
+from src.results.result_table import ResultTable
 
 class BasePostProcessor(ABC):
     @abstractmethod
-    def process(self, data: List[dict]) -> None:
+    def process(self, data: Union[List[dict], ResultTable]) -> None:
         pass
@@ -1,6 +1,7 @@
 from .base_post_processor import BasePostProcessor
-from typing import List
+from typing import List, Union
 import pymongo
+from src.results.result_table import ResultTable
 
 class MongoDBPostProcessor(BasePostProcessor):
     def __init__(self, uri: str, db_name: str, collection_name: str) -> None:
@@ -8,5 +9,7 @@ class MongoDBPostProcessor(BasePostProcessor):
         self.db = self.client[db_name]
         self.collection = self.db[collection_name]
 
-    def process(self, data: List[dict]) -> None:
-        self.collection.insert_many(data)
+    def process(self, data: Union[List[dict], ResultTable]) -> None:
+        if len(data):
+            # insert_many consumes the table's rows one at a time.
+            self.collection.insert_many(iter(data))
@@ -1,8 +1,9 @@
 from .base_post_processor import BasePostProcessor
-from typing import List
+from typing import List, Union
+from src.results.result_table import ResultTable
 
 
 class PrintPostProcessor(BasePostProcessor):
-    def process(self, data: List[dict]) -> None:
+    def process(self, data: Union[List[dict], ResultTable]) -> None:
         for item in data:
             print(item)
@@ -1,11 +1,11 @@
 from .base_post_processor import BasePostProcessor
-from typing import List
-import pandas as pd
+from typing import List, Union
+from src.results.result_table import ResultTable, to_dataframe
 
 class SpreadsheetPostProcessor(BasePostProcessor):
     def __init__(self, filename: str) -> None:
         self.filename = filename
 
-    def process(self, data: List[dict]) -> None:
-        df = pd.DataFrame(data)
+    def process(self, data: Union[List[dict], ResultTable]) -> None:
+        df = to_dataframe(data)
         df.to_excel(self.filename, index=False)
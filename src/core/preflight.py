@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+from nornir.core import Nornir
+from nornir.core.inventory import Host
+
+UNREACHABLE = "unreachable"
+
+
+class ReachabilitySweep:
+    """TCP connect check of every host's SSH port before a run.
+
+    Hosts that refuse or time out are dropped from the Nornir object, so no
+    worker waits out a full netmiko connect timeout on a dead switch.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 2.0,
+        max_concurrency: int = 1000,
+        connection: str = "netmiko",
+        default_port: int = 22,
+    ) -> None:
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.connection = connection
+        self.default_port = default_port
+
+    def address(self, host: Host) -> Tuple[str, int]:
+        params = host.get_connection_parameters(self.connection)
+        return params.hostname or host.name, params.port or self.default_port
+
+    async def check(self, host: Host, semaphore: asyncio.Semaphore) -> Optional[str]:
+        hostname, port = self.address(host)
+        async with semaphore:
+            try:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(hostname, port), self.timeout
+                )
+            except asyncio.TimeoutError:
+                return f"{hostname}:{port} timed out after {self.timeout}s"
+            except OSError as e:
+                return f"{hostname}:{port} {e.strerror or e}"
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+        return None
+
+    async def check_all(self, hosts: List[Host]) -> Dict[str, str]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        errors = await asyncio.gather(*(self.check(host, semaphore) for host in hosts))
+        return {host.name: error for host, error in zip(hosts, errors) if error}
+
+    def sweep(self, nr: Nornir) -> Dict[str, str]:
+        """Return ``{host: reason}`` for every host that did not accept a
+        TCP connection."""
+        hosts = list(nr.inventory.hosts.values())
+        start = time.perf_counter()
+        unreachable = asyncio.run(self.check_all(hosts))
+        logging.info(
+            f"Pre-flight: {len(hosts) - len(unreachable)} of {len(hosts)} hosts "
+            f"reachable in {time.perf_counter() - start:.2f}s"
+        )
+        for name, reason in unreachable.items():
+            logging.warning(f"{name} is unreachable: {reason}")
+        return unreachable
+
+    def filter(self, nr: Nornir) -> Tuple[Nornir, Dict[str, str]]:
+        unreachable = self.sweep(nr)
+        if not unreachable:
+            return nr, unreachable
+        live = nr.filter(filter_func=lambda host: host.name not in unreachable)
+        return live, unreachable
@@ -0,0 +1,67 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from nornir.core import Nornir
+from nornir.core.inventory import Host
+from netmiko.exceptions import NetmikoAuthenticationException
+from src.instrumentation.timing import active_timer
+from src.resilience.retry import active_retry_policy
+from src.tasks.base_task import CONNECT_ERRORS
+
+CONNECT_FAILED = "connect_failed"
+
+
+class SessionPrewarmer:
+    """Opens every host's connection in parallel before the task runs.
+
+    Workers then start on an established session instead of paying SSH
+    setup inside the task, connect time is recorded on its own as the
+    ``connect`` phase, and hosts that cannot be reached are known before any
+    work starts.
+    """
+
+    def __init__(self, max_concurrency: int = 100, connection: str = "netmiko"):
+        self.max_concurrency = max_concurrency
+        self.connection = connection
+
+    def connect(self, host: Host, nr: Nornir) -> Optional[str]:
+        if self.connection in host.connections:
+            return None
+        policy = active_retry_policy()
+        try:
+            with active_timer().phase("connect", host.name):
+                if policy is None:
+                    host.get_connection(self.connection, nr.config)
+                else:
+                    policy.call(
+                        lambda: host.get_connection(self.connection, nr.config),
+                        policy.host_keys(host),
+                        retry_on=CONNECT_ERRORS,
+                        give_up_on=(NetmikoAuthenticationException,),
+                    )
+        except Exception as e:
+            return str(e) or type(e).__name__
+        return None
+
+    def prewarm(self, nr: Nornir) -> Dict[str, str]:
+        """Connect to every host; returns ``{host: error}`` for failures."""
+        hosts = list(nr.inventory.hosts.values())
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            errors = list(executor.map(lambda host: self.connect(host, nr), hosts))
+        failed = {host.name: error for host, error in zip(hosts, errors) if error}
+        logging.info(
+            f"Pre-warm: opened {len(hosts) - len(failed)} of {len(hosts)} "
+            f"sessions in {time.perf_counter() - start:.2f}s"
+        )
+        for name, error in failed.items():
+            logging.error(f"Could not connect to {name}: {error}")
+        return failed
+
+    def filter(self, nr: Nornir) -> Tuple[Nornir, Dict[str, str]]:
+        failed = self.prewarm(nr)
+        if not failed:
+            return nr, failed
+        live = nr.filter(filter_func=lambda host: host.name not in failed)
+        return live, failed
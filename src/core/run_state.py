@@ -0,0 +1,24 @@
+import copy
+from typing import Any, Dict
+from nornir.core import Nornir
+
+
+class RunState:
+    """Puts a long-lived Nornir object back to its freshly loaded state.
+
+    ``nr.filter`` shares ``GlobalState`` and the ``Host`` objects with the
+    inventory it came from, so failed hosts and the keys tasks write into
+    ``host.data`` would otherwise carry over into the next run.
+    """
+
+    def __init__(self, nr: Nornir) -> None:
+        self.nr = nr
+        self.host_data: Dict[str, Dict[str, Any]] = {
+            name: copy.deepcopy(host.data)
+            for name, host in nr.inventory.hosts.items()
+        }
+
+    def reset(self) -> None:
+        self.nr.data.reset_failed_hosts()
+        for name, host in self.nr.inventory.hosts.items():
+            host.data = copy.deepcopy(self.host_data.get(name, {}))
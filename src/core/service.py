@@ -0,0 +1,253 @@
+import logging
+import os
+import queue
+import socket
+import stat
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, List, Optional, Type
+from nornir.core import Nornir
+from nornir.core.inventory import Host
+from src.core.execution_framework import ExecutionFramework
+from src.core.post_processing.base_post_processor import BasePostProcessor
+from src.core.run_state import RunState
+from src.filters.custom_filter import CustomFilter
+from src.inventory.base_inventory import BaseInventory
+from src.tasks.base_task import BaseTask
+
+DEFAULT_ADDRESS = "/tmp/net-task-processor.sock"
+
+
+class ConnectionPool:
+    """Keeps Nornir host connections open between runs.
+
+    Nornir already caches connections on each ``Host``; the pool only decides
+    which of them stay open, bounded by ``max_connections`` (least recently
+    used first) and ``idle_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 200,
+        idle_timeout: float = 300.0,
+        connection: str = "netmiko",
+    ) -> None:
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.connection = connection
+        self.last_used: "OrderedDict[str, float]" = OrderedDict()
+        self.hosts: Dict[str, Host] = {}
+
+    def prepare(self, nr: Nornir) -> None:
+        for host in nr.inventory.hosts.values():
+            plugin = host.connections.get(self.connection)
+            if plugin is None:
+                continue
+            try:
+                alive = plugin.connection.is_alive()
+            except Exception:
+                alive = False
+            if not alive:
+                logging.info(f"Dropping stale {self.connection} session to {host.name}")
+                self.close(host.name, host)
+
+    def release(self, nr: Nornir) -> None:
+        now = time.monotonic()
+        for host in nr.inventory.hosts.values():
+            if self.connection in host.connections:
+                self.hosts[host.name] = host
+                self.last_used[host.name] = now
+                self.last_used.move_to_end(host.name)
+        self.evict()
+
+    def evict(self) -> None:
+        deadline = time.monotonic() - self.idle_timeout
+        for name, used in list(self.last_used.items()):
+            if used < deadline:
+                self.close(name)
+        while len(self.last_used) > self.max_connections:
+            name = next(iter(self.last_used))
+            self.close(name)
+
+    def close(self, name: str, host: Optional[Host] = None) -> None:
+        host = host or self.hosts.get(name)
+        self.last_used.pop(name, None)
+        self.hosts.pop(name, None)
+        if host is None or self.connection not in host.connections:
+            return
+        try:
+            host.close_connection(self.connection)
+        except Exception as e:
+            host.connections.pop(self.connection, None)
+            logging.warning(f"Error closing connection to {name}: {e}")
+
+    def close_all(self) -> None:
+        for name in list(self.last_used):
+            self.close(name)
+
+    def __len__(self) -> int:
+        return len(self.last_used)
+
+
+class ExecutionService:
+    """Long-running mode of ``ExecutionFramework`` that reuses warm sessions.
+
+    The inventory is loaded once and kept for the life of the service, so
+    every request runs against the same ``Host`` objects and their cached
+    connections. Requests come from ``submit`` or from local clients on a
+    ``multiprocessing.connection`` socket, and run one at a time.
+    """
+
+    def __init__(
+        self,
+        inventory_source: Type[BaseInventory],
+        tasks: Dict[str, Type[BaseTask]],
+        config_file: str,
+        post_processors: Optional[List[Type[BasePostProcessor]]] = None,
+        pool: Optional[ConnectionPool] = None,
+        address: str = DEFAULT_ADDRESS,
+        authkey: bytes = b"net-task-processor",
+    ) -> None:
+        self.inventory_source = inventory_source
+        self.tasks = tasks
+        self.config_file = config_file
+        self.post_processors = post_processors if post_processors else []
+        self.pool = pool if pool else ConnectionPool()
+        self.address = address
+        self.authkey = authkey
+        self.requests: "queue.Queue[tuple]" = queue.Queue()
+        self.nr: Optional[Nornir] = None
+        self.run_state: Optional[RunState] = None
+        self.running = False
+
+    def submit(self, request: Dict[str, Any]) -> Future:
+        future: Future = Future()
+        self.requests.put((request, future))
+        return future
+
+    def handle(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        task_name = request["task"]
+        if task_name not in self.tasks:
+            raise ValueError(f"Unknown task {task_name}")
+        self.run_state.reset()
+        nr = CustomFilter(request.get("filter")).apply(self.nr)
+        framework = ExecutionFramework(
+            inventory_source=self.inventory_source,
+            filter_obj=None,
+            task=self.tasks[task_name],
+            config_file=self.config_file,
+            execution_mode=request.get("mode", "proposal"),
+            post_processors=self.post_processors,
+        )
+        self.pool.prepare(nr)
+        try:
+            return framework.execute(nr)
+        finally:
+            self.pool.release(nr)
+
+    def serve_forever(self, reap_interval: float = 5.0) -> None:
+        self.nr = self.inventory_source.get_inventory()
+        self.run_state = RunState(self.nr)
+        self.remove_stale_socket()
+        listener = Listener(self.address, authkey=self.authkey)
+        self.running = True
+        threading.Thread(target=self.listen, args=(listener,), daemon=True).start()
+        logging.info(f"Execution service listening on {self.address}")
+        try:
+            while self.running:
+                try:
+                    request, future = self.requests.get(timeout=reap_interval)
+                except queue.Empty:
+                    self.pool.evict()
+                    continue
+                if not future.set_running_or_notify_cancel():
+                    continue
+                start = time.perf_counter()
+                try:
+                    future.set_result(self.handle(request))
+                except Exception as e:
+                    logging.error(f"Request {request} failed: {e}")
+                    future.set_exception(e)
+                logging.info(
+                    f"Request {request} finished in {time.perf_counter() - start:.2f}s, "
+                    f"{len(self.pool)} sessions warm"
+                )
+        finally:
+            self.running = False
+            listener.close()
+            self.pool.close_all()
+
+    def remove_stale_socket(self) -> None:
+        """Unlink a socket file left behind by a service that did not shut
+        down cleanly. A socket that still accepts connections is left alone,
+        so binding fails rather than taking over a running service."""
+        try:
+            if not stat.S_ISSOCK(os.stat(self.address).st_mode):
+                return
+        except (OSError, TypeError):
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(self.address)
+            except ConnectionRefusedError:
+                logging.info(f"Removing stale service socket {self.address}")
+                os.unlink(self.address)
+            except OSError:
+                return
+
+    def listen(self, listener: Listener) -> None:
+        with listener:
+            while self.running:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    if not self.running:
+                        break
+                    logging.warning(f"Rejected service client: {e}")
+                    continue
+                threading.Thread(target=self.reply, args=(conn,), daemon=True).start()
+
+    def reply(self, conn) -> None:
+        with conn:
+            request = conn.recv()
+            if request == "shutdown":
+                self.stop()
+                conn.send({"status": "stopping"})
+                return
+            try:
+                conn.send({"result": self.submit(request).result()})
+            except Exception as e:
+                conn.send({"error": str(e)})
+
+    def stop(self) -> None:
+        self.running = False
+
+
+class ServiceClient:
+    def __init__(
+        self, address: str = DEFAULT_ADDRESS, authkey: bytes = b"net-task-processor"
+    ) -> None:
+        self.address = address
+        self.authkey = authkey
+
+    def request(self, message: Any) -> Dict[str, Any]:
+        with Client(self.address, authkey=self.authkey) as conn:
+            conn.send(message)
+            return conn.recv()
+
+    def run(
+        self,
+        task: str,
+        mode: str = "proposal",
+        filter_criteria: Optional[dict] = None,
+    ) -> List[Dict[str, Any]]:
+        response = self.request({"task": task, "mode": mode, "filter": filter_criteria})
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    def shutdown(self) -> None:
+        self.request("shutdown")
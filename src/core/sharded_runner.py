@@ -0,0 +1,98 @@
+import logging
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Type, Union
+from nornir.core import Nornir
+from nornir.core.inventory import Host
+from src.inventory.base_inventory import BaseInventory
+from src.tasks.base_task import BaseTask
+from src.results.result_table import ResultTable
+
+_worker: Dict[str, Any] = {}
+
+
+def shard_of(host: Host, shard_by: str, num_shards: int) -> int:
+    value = host.name if shard_by == "name" else host.get(shard_by)
+    # crc32 rather than hash() so shard assignment is stable across processes.
+    return zlib.crc32(str(value).encode()) % num_shards
+
+
+def init_worker(
+    inventory_source: Type[BaseInventory], task: Type[BaseTask], execution_mode: str
+) -> None:
+    _worker["inventory_source"] = inventory_source
+    _worker["task"] = task
+    _worker["execution_mode"] = execution_mode
+
+
+def run_shard(shard: int, host_names: List[str]) -> List[Dict[str, Any]]:
+    names = set(host_names)
+    nr: Nornir = _worker["inventory_source"].get_inventory()
+    nr = nr.filter(filter_func=lambda host: host.name in names)
+    logging.info(f"Shard {shard} running {len(nr.inventory.hosts)} hosts")
+    if _worker["execution_mode"] == "proposal":
+        return _worker["task"].propose(nr)
+    elif _worker["execution_mode"] == "apply":
+        return _worker["task"].apply(nr)
+
+
+class ShardedRunner:
+    """Splits a filtered inventory across worker processes.
+
+    Each worker reloads the inventory, keeps only its shard of hosts and runs
+    the task with its own threaded Nornir. Shard results are yielded to the
+    parent as each worker finishes.
+    """
+
+    def __init__(
+        self,
+        inventory_source: Type[BaseInventory],
+        task: Type[BaseTask],
+        execution_mode: str,
+        num_processes: int,
+        shard_by: str = "name",
+    ) -> None:
+        self.inventory_source = inventory_source
+        self.task = task
+        self.execution_mode = execution_mode
+        self.num_processes = num_processes
+        self.shard_by = shard_by
+
+    def shards(self, nr: Nornir) -> Dict[int, List[str]]:
+        shards: Dict[int, List[str]] = {}
+        for host in nr.inventory.hosts.values():
+            shard = shard_of(host, self.shard_by, self.num_processes)
+            shards.setdefault(shard, []).append(host.name)
+        return shards
+
+    def stream(self, nr: Nornir) -> Iterator[List[Dict[str, Any]]]:
+        shards = self.shards(nr)
+        # Fork hands the task and inventory source to workers without pickling.
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(
+            max_workers=len(shards) or 1,
+            mp_context=context,
+            initializer=init_worker,
+            initargs=(self.inventory_source, self.task, self.execution_mode),
+        ) as executor:
+            futures = {
+                executor.submit(run_shard, shard, names): shard
+                for shard, names in shards.items()
+            }
+            for future in as_completed(futures):
+                shard = futures[future]
+                result: Optional[Union[List[Dict[str, Any]], ResultTable]] = (
+                    future.result()
+                )
+                logging.info(f"Shard {shard} finished {len(shards[shard])} hosts")
+                yield [] if result is None else result
+
+    def run(self, nr: Nornir) -> Union[List[Dict[str, Any]], ResultTable]:
+        shard_results = list(self.stream(nr))
+        if shard_results and all(isinstance(r, ResultTable) for r in shard_results):
+            return ResultTable.concat(shard_results)
+        results: List[Dict[str, Any]] = []
+        for shard_result in shard_results:
+            results.extend(shard_result)
+        return results
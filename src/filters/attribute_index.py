@@ -0,0 +1,90 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from nornir.core.inventory import Host, Hosts
+
+IN_SUFFIX = "__in"
+_MISSING = object()
+
+
+class AttributeIndex:
+    """Inverted index of host attribute values to host names.
+
+    Values are resolved the same way ``F`` resolves a single-segment rule, so
+    an indexed lookup returns exactly the hosts ``F`` would have matched.
+    Fields holding unhashable values for any host are left unindexed.
+    """
+
+    def __init__(self, hosts: Hosts, fields: Iterable[str]) -> None:
+        self.hosts = hosts
+        self.order: Dict[str, int] = {name: i for i, name in enumerate(hosts)}
+        self.postings: Dict[str, Dict[Any, Set[str]]] = {}
+        self.data_postings: Dict[str, Dict[Any, Set[str]]] = {}
+        for field in fields:
+            if "__" not in field:
+                self._index_field(field)
+
+    def _index_field(self, field: str) -> None:
+        postings: Dict[Any, Set[str]] = defaultdict(set)
+        data_postings: Dict[Any, Set[str]] = defaultdict(set)
+        try:
+            for name, host in self.hosts.items():
+                postings[self.attribute_value(host, field)].add(name)
+                data_postings[host.get(field, _MISSING)].add(name)
+        except TypeError:
+            return
+        self.postings[field] = dict(postings)
+        self.data_postings[field] = dict(data_postings)
+
+    @staticmethod
+    def attribute_value(host: Host, field: str) -> Any:
+        if hasattr(host, field) and not callable(getattr(host, field)):
+            return getattr(host, field)
+        return host.get(field)
+
+    def resolve(
+        self, criteria: Dict[str, Any]
+    ) -> Tuple[Optional[Set[str]], Dict[str, Any]]:
+        """Resolve what the index can answer.
+
+        Returns the set of matching host names (``None`` when no criterion was
+        indexable) and the criteria that still need to be checked with ``F``.
+        """
+        matched: Optional[Set[str]] = None
+        remaining: Dict[str, Any] = {}
+        for key, value in criteria.items():
+            names = self._lookup(key, value)
+            if names is None:
+                remaining[key] = value
+                continue
+            matched = names if matched is None else matched & names
+        return matched, remaining
+
+    def _lookup(self, key: str, value: Any) -> Optional[Set[str]]:
+        if key.endswith(IN_SUFFIX):
+            field = key[: -len(IN_SUFFIX)]
+            # ``F`` resolves ``field__in`` through ``host.get`` rather than
+            # host attributes, so the data postings are used here.
+            postings = self.data_postings.get(field)
+            if postings is None or isinstance(value, str):
+                return None
+            try:
+                candidates = list(value)
+            except TypeError:
+                return None
+            names: Set[str] = set()
+            for candidate in candidates:
+                try:
+                    names |= postings.get(candidate, set())
+                except TypeError:
+                    return None
+            return names
+        postings = self.postings.get(key)
+        if postings is None:
+            return None
+        try:
+            return set(postings.get(value, set()))
+        except TypeError:
+            return None
+
+    def ordered(self, names: Set[str]) -> List[str]:
+        return sorted(names, key=self.order.__getitem__)
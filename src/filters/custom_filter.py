@@ -1,13 +1,52 @@
+import logging
+import time
+from typing import List, Optional
 from nornir.core.filter import F
+from nornir.core.inventory import Hosts, Inventory
+from .attribute_index import AttributeIndex
 from .base_filter import BaseFilter
 from nornir.core import Nornir
 
 
 class CustomFilter(BaseFilter):
-    def __init__(self, filter_criteria: dict = None) -> None:
+    def __init__(
+        self, filter_criteria: dict = None, index_fields: Optional[List[str]] = None
+    ) -> None:
         self.filter_criteria = filter_criteria
+        self.index_fields = index_fields
+        self.index: Optional[AttributeIndex] = None
+        self.last_evaluation_time: Optional[float] = None
 
     def apply(self, nr: Nornir) -> Nornir:
         if not self.filter_criteria:
             return nr
-        return nr.filter(F(**self.filter_criteria))
+        start = time.perf_counter()
+        if self.index_fields:
+            filtered = self.apply_indexed(nr)
+        else:
+            filtered = nr.filter(F(**self.filter_criteria))
+        self.last_evaluation_time = time.perf_counter() - start
+        logging.info(
+            f"Filter {self.filter_criteria} matched {len(filtered.inventory.hosts)} "
+            f"of {len(nr.inventory.hosts)} hosts in {self.last_evaluation_time:.6f}s"
+        )
+        return filtered
+
+    def apply_indexed(self, nr: Nornir) -> Nornir:
+        hosts = nr.inventory.hosts
+        if self.index is None or self.index.hosts is not hosts:
+            self.index = AttributeIndex(hosts, self.index_fields)
+        matched, remaining = self.index.resolve(self.filter_criteria)
+        if matched is None:
+            return nr.filter(F(**remaining))
+        names = self.index.ordered(matched)
+        if remaining:
+            residual = F(**remaining)
+            names = [name for name in names if residual(hosts[name])]
+        filtered = Nornir(**nr.__dict__)
+        filtered.inventory = Inventory(
+            hosts=Hosts({name: hosts[name] for name in names}),
+            groups=nr.inventory.groups,
+            defaults=nr.inventory.defaults,
+        )
+        return filtered
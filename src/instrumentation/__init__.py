@@ -0,0 +1,24 @@
+from .profiling import RunProfiler, StackSampler
+from .timing import (
+    PhaseTimer,
+    TimingProcessor,
+    TimedSession,
+    active_timer,
+    set_active_timer,
+    instrument_api,
+    instrument_meraki,
+    limited_request,
+)
+
+__all__ = [
+    "RunProfiler",
+    "StackSampler",
+    "PhaseTimer",
+    "TimingProcessor",
+    "TimedSession",
+    "active_timer",
+    "set_active_timer",
+    "instrument_api",
+    "instrument_meraki",
+    "limited_request",
+]
@@ -0,0 +1,123 @@
+import itertools
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+
+# Numbers the profiles taken in this process, so runs started within the
+# same second, such as back-to-back service requests, get their own directory.
+_run_numbers = itertools.count(1)
+
+
+class StackSampler:
+    """Samples the stacks of every thread, Nornir workers included, at a
+    fixed interval and counts them in flamegraph collapsed-stack form."""
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.thread = threading.Thread(
+            target=self.run, name="stack-sampler", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+
+    def run(self) -> None:
+        own_id = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names: Dict[int, str] = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                        f":{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                thread = names.get(thread_id, str(thread_id)).split("_")[0]
+                self.stacks[";".join([thread, *reversed(stack)])] += 1
+            self.samples += 1
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class RunProfiler:
+    """Captures a sampled call graph, allocation sites and peak traced memory
+    for the wrapped block and writes them to a timestamped directory."""
+
+    def __init__(
+        self,
+        profile_dir: str,
+        interval: float = 0.005,
+        top_allocations: int = 50,
+        traceback_limit: int = 1,
+    ) -> None:
+        self.run_dir = os.path.join(
+            profile_dir,
+            f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+            f"-{next(_run_numbers)}",
+        )
+        self.sampler = StackSampler(interval)
+        self.top_allocations = top_allocations
+        self.traceback_limit = traceback_limit
+        self.start = 0.0
+
+    def __enter__(self) -> "RunProfiler":
+        os.makedirs(self.run_dir, exist_ok=True)
+        tracemalloc.start(self.traceback_limit)
+        self.start = time.perf_counter()
+        self.sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.sampler.stop()
+        duration = time.perf_counter() - self.start
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.sampler.write_collapsed(os.path.join(self.run_dir, "stacks.collapsed"))
+        with open(os.path.join(self.run_dir, "allocations.txt"), "w") as f:
+            key = "lineno" if self.traceback_limit == 1 else "traceback"
+            for stat in snapshot.statistics(key)[: self.top_allocations]:
+                f.write(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                for line in stat.traceback.format():
+                    f.write(f"{line}\n")
+                f.write("\n")
+        summary = {
+            "duration_seconds": duration,
+            "samples": self.sampler.samples,
+            "traced_current_bytes": current,
+            # Peak of Python allocations during this run alone.
+            "traced_peak_bytes": peak,
+            # ru_maxrss is the whole process's peak since it started, in KiB
+            # on Linux, so in service mode it spans earlier runs too.
+            "process_peak_rss_bytes": (
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+            ),
+        }
+        with open(os.path.join(self.run_dir, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+        logging.info(f"Profile written to {self.run_dir}")
@@ -0,0 +1,299 @@
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from nornir.core.inventory import Host
+from nornir.core.task import AggregatedResult, MultiResult, Task
+from src.resilience.rate_limit import rate_limiter
+from src.resilience.retry import active_retry_policy
+
+RUN = "_run"
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUS = {429, 502, 503, 504}
+
+_local = threading.local()
+
+
+def current_host() -> str:
+    return getattr(_local, "host", RUN)
+
+
+def set_current_host(name: str) -> None:
+    _local.host = name
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+class PhaseTimer:
+    """Per-host, per-phase durations and call counts for one run.
+
+    Phases are free-form names such as ``connect``, ``command``, ``parse``,
+    ``netbox_api`` or ``post_processing``. Host defaults to the host the
+    calling Nornir worker thread is running, or ``_run`` outside of one.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.durations: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+        self.counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, phase: str, duration: float, host: Optional[str] = None) -> None:
+        with self.lock:
+            self.durations[phase][host or current_host()] += duration
+
+    def count(self, name: str, host: Optional[str] = None, n: int = 1) -> None:
+        with self.lock:
+            self.counts[name][host or current_host()] += n
+
+    @contextmanager
+    def phase(self, phase: str, host: Optional[str] = None) -> Iterator[None]:
+        host = host or current_host()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start, host)
+
+    def host_totals(self) -> Dict[str, float]:
+        totals: Dict[str, float] = defaultdict(float)
+        # The per-host "task" phase already includes the nested phases.
+        phases = ["task"] if "task" in self.durations else list(self.durations)
+        for phase in phases:
+            for host, duration in self.durations[phase].items():
+                if host != RUN:
+                    totals[host] += duration
+        return totals
+
+    def summary(self, slowest: int = 10) -> Dict[str, Any]:
+        phases = {}
+        for phase, hosts in self.durations.items():
+            values = [d for host, d in hosts.items() if host != RUN]
+            phases[phase] = {
+                "hosts": len(values),
+                "total": sum(hosts.values()),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "max": max(values, default=0.0),
+            }
+        totals = self.host_totals()
+        return {
+            "phases": phases,
+            "counts": {
+                name: sum(hosts.values()) for name, hosts in self.counts.items()
+            },
+            "slowest_hosts": sorted(totals.items(), key=lambda i: i[1], reverse=True)[
+                :slowest
+            ],
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "summary": self.summary(),
+            "durations": {
+                phase: dict(hosts) for phase, hosts in self.durations.items()
+            },
+            "counts": {name: dict(hosts) for name, hosts in self.counts.items()},
+        }
+
+    def export_json(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def export_prometheus(self, path: str, prefix: str = "net_task_processor") -> None:
+        lines = [
+            f"# HELP {prefix}_phase_seconds Time spent per host and phase.",
+            f"# TYPE {prefix}_phase_seconds gauge",
+        ]
+        for phase, hosts in self.durations.items():
+            for host, duration in hosts.items():
+                lines.append(
+                    f'{prefix}_phase_seconds{{host="{host}",phase="{phase}"}} {duration}'
+                )
+        lines += [
+            f"# HELP {prefix}_phase_quantile_seconds Per-host phase time quantiles.",
+            f"# TYPE {prefix}_phase_quantile_seconds gauge",
+        ]
+        for phase, stats in self.summary()["phases"].items():
+            for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                lines.append(
+                    f'{prefix}_phase_quantile_seconds{{phase="{phase}",'
+                    f'quantile="{quantile}"}} {stats[key]}'
+                )
+        lines += [
+            f"# HELP {prefix}_calls_total Calls made per host.",
+            f"# TYPE {prefix}_calls_total counter",
+        ]
+        for name, hosts in self.counts.items():
+            for host, n in hosts.items():
+                lines.append(f'{prefix}_calls_total{{host="{host}",call="{name}"}} {n}')
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+_active = PhaseTimer()
+
+
+def active_timer() -> PhaseTimer:
+    return _active
+
+
+def set_active_timer(timer: PhaseTimer) -> None:
+    global _active
+    _active = timer
+
+
+class TimingProcessor:
+    """Nornir processor that tags worker threads with their host and times
+    each host's top-level task."""
+
+    def __init__(self, timer: PhaseTimer) -> None:
+        self.timer = timer
+        self.started: Dict[str, float] = {}
+
+    def task_started(self, task: Task) -> None:
+        pass
+
+    def task_completed(self, task: Task, result: AggregatedResult) -> None:
+        pass
+
+    def task_instance_started(self, task: Task, host: Host) -> None:
+        set_current_host(host.name)
+        self.started[host.name] = time.perf_counter()
+
+    def task_instance_completed(
+        self, task: Task, host: Host, result: MultiResult
+    ) -> None:
+        start = self.started.pop(host.name, None)
+        if start is not None:
+            self.timer.record("task", time.perf_counter() - start, host.name)
+        set_current_host(RUN)
+
+    def subtask_instance_started(self, task: Task, host: Host) -> None:
+        pass
+
+    def subtask_instance_completed(
+        self, task: Task, host: Host, result: MultiResult
+    ) -> None:
+        pass
+
+
+class TimedSession(requests.Session):
+    """``requests`` session that records API time and call counts.
+
+    ``read_only`` marks every request as a read for rate limiting and
+    retries, for APIs such as GraphQL that read over POST.
+    """
+
+    def __init__(self, api: str = "netbox", read_only: bool = False) -> None:
+        super().__init__()
+        self.api = api
+        self.read_only = read_only
+
+    def size_pool(self, connections: int) -> None:
+        """Keep up to ``connections`` connections per API host, one per
+        thread that shares the session. urllib3 keeps 10 by default and
+        discards the rest after each request."""
+        adapter = HTTPAdapter(pool_maxsize=max(connections, 10))
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def request(self, method: str, url: str, *args: Any, **kwargs: Any):
+        policy = active_retry_policy()
+        if policy is None:
+            return self.timed_request(method, url, *args, **kwargs)
+        if self.read_only or method.upper() in IDEMPOTENT_METHODS:
+            retry_on = (requests.ConnectionError, requests.Timeout)
+            retry_status = RETRY_STATUS
+        else:
+            # The server may have acted on a write whose response was lost,
+            # so only retry writes it certainly never received or refused.
+            retry_on = (requests.exceptions.ConnectTimeout,)
+            retry_status = {429, 503}
+        return policy.call(
+            lambda: self.timed_request(method, url, *args, **kwargs),
+            [f"api:{self.api}"],
+            retry_on=retry_on,
+            failed_result=lambda response: response.status_code in retry_status,
+            # The rate limiter backs off on 429; it is not an outage.
+            throttled_result=lambda response: response.status_code == 429,
+        )
+
+    def timed_request(self, method: str, url: str, *args: Any, **kwargs: Any):
+        return limited_request(
+            self.api,
+            super().request,
+            method,
+            url,
+            *args,
+            read_only=self.read_only,
+            **kwargs,
+        )
+
+
+def limited_request(
+    api: str,
+    send: Callable[..., Any],
+    method: str,
+    *args: Any,
+    read_only: bool = False,
+    **kwargs: Any,
+) -> Any:
+    """Make one API call through the API's shared rate limiter, recording
+    time spent throttled as the ``{api}_throttled`` phase."""
+    timer = active_timer()
+    limiter = rate_limiter(api)
+    limit_as = "GET" if read_only else method
+    waited = limiter.acquire(limit_as)
+    if waited:
+        timer.record(f"{api}_throttled", waited)
+        timer.count(f"{api}_throttled_calls")
+    timer.count(f"{api}_api_calls")
+    start = time.perf_counter()
+    with timer.phase(f"{api}_api"):
+        response = send(method, *args, **kwargs)
+    limiter.observe(
+        limit_as,
+        response.status_code,
+        time.perf_counter() - start,
+        response.headers.get("Retry-After"),
+    )
+    return response
+
+
+def instrument_api(client: Any, api: str = "netbox") -> Any:
+    """Swap a pynetbox client's HTTP session for a ``TimedSession``."""
+    client.http_session = TimedSession(api)
+    return client
+
+
+def instrument_meraki(dashboard: Any, api: str = "meraki") -> Any:
+    """Route a Meraki ``DashboardAPI``'s requests through the shared rate
+    limiter and timer. The SDK keeps its own retries on 429."""
+    session = dashboard._session
+    if hasattr(session, "_send_request"):
+        # Newer SDKs send every request through _send_request, older ones
+        # through a requests session.
+        send = session._send_request
+        session._send_request = lambda method, *args, **kwargs: limited_request(
+            api, send, method, *args, **kwargs
+        )
+    else:
+        send = session._req_session.request
+        session._req_session.request = lambda method, *args, **kwargs: (
+            limited_request(api, send, method, *args, **kwargs)
+        )
+    return dashboard
@@ -0,0 +1,185 @@
+import logging
+import os
+from typing import Any, Dict, Iterator, Optional
+import pandas as pd
+from nornir import InitNornir
+from nornir.core import Nornir
+from nornir.core.inventory import (
+    Defaults,
+    Group,
+    Groups,
+    Host,
+    Hosts,
+    Inventory,
+    ParentGroups,
+)
+from nornir.core.plugins.inventory import InventoryPluginRegister
+from src.inventory.base_inventory import BaseInventory
+
+BASE_ATTRIBUTES = ("hostname", "username", "password", "platform", "port")
+
+DEFAULT_DTYPES = {
+    "name": "string",
+    "hostname": "string",
+    "username": "string",
+    "password": "string",
+    "platform": "category",
+    "port": "Int64",
+    "groups": "string",
+    "site_id": "category",
+    "device_type": "category",
+    "function": "category",
+}
+
+IPV4_OCTET = r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+IPV4_PATTERN = rf"{IPV4_OCTET}(?:\.{IPV4_OCTET}){{3}}"
+
+
+class InventoryValidationError(ValueError):
+    def __init__(self, rejected: pd.DataFrame) -> None:
+        self.rejected = rejected
+        super().__init__(
+            f"{len(rejected)} invalid inventory rows:\n{rejected.to_string()}"
+        )
+
+
+def is_valid_ip_column(hostnames: pd.Series) -> pd.Series:
+    valid = hostnames.str.fullmatch(IPV4_PATTERN).fillna(False).astype(bool)
+    # Only the rare IPv6 candidates go through the scalar parser.
+    candidates = ~valid & hostnames.str.contains(":", regex=False).fillna(False)
+    if candidates.any():
+        from ipaddress import IPv6Address
+
+        def parse(value: str) -> bool:
+            try:
+                IPv6Address(value)
+                return True
+            except ValueError:
+                return False
+
+        ipv6 = hostnames[candidates].map(parse).astype(bool)
+        valid |= ipv6.reindex(valid.index, fill_value=False)
+    return valid
+
+
+class ColumnarCsvInventoryPlugin:
+    def __init__(
+        self,
+        inventory_dir_path: str = "./inventory",
+        hosts_file: str = "hosts.csv",
+        dtypes: Optional[Dict[str, str]] = None,
+        chunksize: Optional[int] = None,
+        strict: bool = False,
+        defaults: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.hosts_file = os.path.join(inventory_dir_path, hosts_file)
+        self.dtypes = {**DEFAULT_DTYPES, **(dtypes or {})}
+        self.chunksize = chunksize
+        self.strict = strict
+        self.defaults = Defaults(**(defaults or {}))
+        self.groups = Groups()
+        self.rejected = pd.DataFrame()
+
+    def read_chunks(self) -> Iterator[pd.DataFrame]:
+        header = pd.read_csv(self.hosts_file, nrows=0).columns
+        dtypes = {k: v for k, v in self.dtypes.items() if k in header}
+        reader = pd.read_csv(
+            self.hosts_file,
+            dtype=dtypes,
+            chunksize=self.chunksize,
+            skipinitialspace=True,
+        )
+        if self.chunksize is None:
+            yield reader
+        else:
+            yield from reader
+
+    def validate(self, df: pd.DataFrame, seen: set) -> pd.DataFrame:
+        reasons = pd.Series("", index=df.index, dtype="object")
+        missing_name = (df["name"].isna() | (df["name"] == "")).fillna(True)
+        reasons[missing_name] += "missing name; "
+        if "hostname" in df:
+            bad_ip = ~is_valid_ip_column(df["hostname"].str.strip())
+            reasons[bad_ip] += "hostname is not an IP address; "
+        duplicate = df["name"].duplicated(keep="first") | df["name"].isin(seen)
+        duplicate = duplicate.fillna(False)
+        reasons[duplicate & ~missing_name] += "duplicate name; "
+
+        bad = reasons != ""
+        if bad.any():
+            rejected = df[bad].assign(reason=reasons[bad].str.rstrip("; "))
+            # Header is line 1, so the first data row is line 2.
+            rejected.insert(0, "line", rejected.index + 2)
+            self.rejected = pd.concat([self.rejected, rejected])
+        return df[~bad]
+
+    def build_groups(self, group_column: pd.Series) -> None:
+        names = group_column.dropna().str.split().explode().dropna().unique()
+        for name in names:
+            if name not in self.groups:
+                self.groups[name] = Group(name=name, defaults=self.defaults)
+
+    def build_hosts(self, df: pd.DataFrame, hosts: Hosts) -> None:
+        df = df.astype(object).where(df.notna(), None)
+        base = [attr for attr in BASE_ATTRIBUTES if attr in df]
+        data = [col for col in df.columns if col not in base + ["name", "groups"]]
+        names = df["name"].tolist()
+        base_columns = [df[attr].tolist() for attr in base]
+        data_columns = [df[col].tolist() for col in data]
+        group_column = df["groups"].tolist() if "groups" in df else [None] * len(names)
+
+        parent_groups: Dict[Any, ParentGroups] = {}
+        for i, name in enumerate(names):
+            group_names = group_column[i]
+            if group_names not in parent_groups:
+                parent_groups[group_names] = [
+                    self.groups[group] for group in (group_names or "").split()
+                ]
+            hosts[name] = Host(
+                name=name,
+                groups=ParentGroups(parent_groups[group_names]),
+                data={col: column[i] for col, column in zip(data, data_columns)},
+                defaults=self.defaults,
+                **{attr: column[i] for attr, column in zip(base, base_columns)},
+            )
+
+    def load(self) -> Inventory:
+        hosts = Hosts()
+        seen: set = set()
+        self.rejected = pd.DataFrame()
+        for chunk in self.read_chunks():
+            chunk["name"] = chunk["name"].str.strip()
+            valid = self.validate(chunk, seen)
+            seen.update(valid["name"].tolist())
+            if "groups" in valid:
+                self.build_groups(valid["groups"])
+            self.build_hosts(valid, hosts)
+
+        if not self.rejected.empty:
+            if self.strict:
+                raise InventoryValidationError(self.rejected)
+            logging.warning(
+                f"Skipped {len(self.rejected)} invalid rows in {self.hosts_file}:\n"
+                f"{self.rejected[['line', 'name', 'reason']].to_string(index=False)}"
+            )
+        logging.info(f"Loaded {len(hosts)} hosts from {self.hosts_file}")
+        return Inventory(hosts=hosts, groups=self.groups, defaults=self.defaults)
+
+
+InventoryPluginRegister.register("ColumnarCsvInventory", ColumnarCsvInventoryPlugin)
+
+
+class ColumnarCSVInventory(BaseInventory):
+    def __init__(self, config_path: str, **options: Any) -> None:
+        self.config_path = config_path
+        self.options = options
+
+    def get_inventory(self) -> Nornir:
+        return InitNornir(
+            config_file=self.config_path,
+            inventory={"plugin": "ColumnarCsvInventory", "options": self.options},
+        )
+
+    def propose_inventory(self, nr: Nornir) -> None:
+        for host in nr.inventory.hosts.values():
+            print(f"{host.name}: {host.hostname} ({host.platform})")
@@ -0,0 +1,3 @@
+from .graphql import GraphQLError, NetBoxGraphQL, NetBoxSnapshot, SNAPSHOT_QUERY
+
+__all__ = ["GraphQLError", "NetBoxGraphQL", "NetBoxSnapshot", "SNAPSHOT_QUERY"]
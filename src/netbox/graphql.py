@@ -0,0 +1,172 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+import requests
+
+# Filter syntax is that of NetBox 4.0-4.2, where list filters take the
+# filterset's multi-value fields directly. Devices are matched with
+# name__ie, case-insensitively, as the REST lookup they replace did.
+SNAPSHOT_QUERY = """
+query NetBoxSnapshot(
+  $devices: [String!], $addresses: [String!], $prefixes: [String!]
+) {
+  device_list(filters: {name__ie: $devices}) {
+    id name
+    site { id name slug }
+    device_type { id model slug }
+    role { id name slug }
+    primary_ip4 { id address }
+    interfaces { id name description mac_address vrf { id name } }
+  }
+  ip_address_list(filters: {address: $addresses}) {
+    id address assigned_object_type assigned_object_id vrf { id name }
+  }
+  prefix_list(filters: {prefix: $prefixes}) {
+    id prefix site { id name } vrf { id name } role { id name }
+  }
+  manufacturer_list(filters: {slug: ["cisco"]}) { id name slug }
+  device_type_list(filters: {manufacturer: ["cisco"]}) {
+    id model slug manufacturer { id name slug }
+  }
+  vrf_list(filters: {name: ["Global"]}) { id name }
+  role_list(filters: {name: ["Transit Network"]}) { id name slug }
+}
+"""
+
+
+class GraphQLError(Exception):
+    pass
+
+
+def int_ids(value: Any) -> Any:
+    """GraphQL returns IDs as strings; the REST API and pynetbox use ints."""
+    if isinstance(value, dict):
+        return {
+            k: int(v) if k == "id" and isinstance(v, str) else int_ids(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [int_ids(item) for item in value]
+    return value
+
+
+class NetBoxGraphQL:
+    def __init__(
+        self, url: str, token: str, session: Optional[requests.Session] = None
+    ) -> None:
+        self.url = f"{url.rstrip('/')}/graphql/"
+        self.session = session or requests.Session()
+        self.session.headers.update(
+            {
+                "Authorization": f"Token {token}",
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+            }
+        )
+
+    def query(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        response = self.session.post(
+            self.url, json={"query": query, "variables": variables}
+        )
+        response.raise_for_status()
+        body = response.json()
+        if body.get("errors"):
+            raise GraphQLError("; ".join(e["message"] for e in body["errors"]))
+        return int_ids(body["data"])
+
+
+class NetBoxSnapshot:
+    """NetBox state for a set of devices, read in one GraphQL query per
+    batch and indexed for the sync logic.
+
+    Lookups return pynetbox records bound to the REST endpoints, so the sync
+    code can ``save()`` them as if it had fetched them with ``get()``. A
+    miss means the object does not exist, because the query asked for every
+    device, address and prefix the sync will look up; objects the sync
+    creates are added with ``add`` so later hosts in the run find them.
+    """
+
+    def __init__(self, nb: Any) -> None:
+        self.nb = nb
+        self.endpoints = {
+            "device": nb.dcim.devices,
+            "interface": nb.dcim.interfaces,
+            "ip_address": nb.ipam.ip_addresses,
+            "prefix": nb.ipam.prefixes,
+            "manufacturer": nb.dcim.manufacturers,
+            "device_type": nb.dcim.device_types,
+            "vrf": nb.ipam.vrfs,
+            "role": nb.ipam.roles,
+        }
+        self.index: Dict[str, Dict[Any, Any]] = {kind: {} for kind in self.endpoints}
+
+    def record(self, kind: str, values: Dict[str, Any]) -> Any:
+        endpoint = self.endpoints[kind]
+        return endpoint.return_obj(values, self.nb, endpoint)
+
+    def add(self, kind: str, key: Any, record: Any) -> None:
+        self.index[kind][key] = record
+
+    def get(self, kind: str, key: Any) -> Optional[Any]:
+        return self.index[kind].get(key)
+
+    def load_batch(self, data: Dict[str, Any]) -> None:
+        for device in data["device_list"]:
+            interfaces = device.pop("interfaces", [])
+            self.add("device", device["name"].lower(), self.record("device", device))
+            for interface in interfaces:
+                interface["device"] = {"id": device["id"], "name": device["name"]}
+                self.add(
+                    "interface",
+                    (device["id"], interface["name"]),
+                    self.record("interface", interface),
+                )
+        for ip in data["ip_address_list"]:
+            self.add("ip_address", ip["address"], self.record("ip_address", ip))
+        for prefix in data["prefix_list"]:
+            self.add("prefix", prefix["prefix"], self.record("prefix", prefix))
+        for manufacturer in data["manufacturer_list"]:
+            self.add(
+                "manufacturer",
+                manufacturer["name"],
+                self.record("manufacturer", manufacturer),
+            )
+        for device_type in data["device_type_list"]:
+            self.add(
+                "device_type",
+                device_type["model"],
+                self.record("device_type", device_type),
+            )
+        for vrf in data["vrf_list"]:
+            self.add("vrf", vrf["name"], self.record("vrf", vrf))
+        for role in data["role_list"]:
+            self.add("role", role["name"], self.record("role", role))
+
+    @classmethod
+    def load(
+        cls,
+        nb: Any,
+        client: NetBoxGraphQL,
+        targets: Dict[str, Dict[str, Iterable[str]]],
+        batch_size: int = 200,
+    ) -> "NetBoxSnapshot":
+        """``targets`` maps each device name to the ``addresses`` and
+        ``prefixes`` its sync will look up."""
+        snapshot = cls(nb)
+        names = list(targets)
+        for start in range(0, len(names), batch_size):
+            batch = names[start : start + batch_size]
+            variables: Dict[str, List[str]] = {
+                "devices": batch,
+                "addresses": sorted(
+                    {a for name in batch for a in targets[name]["addresses"]}
+                ),
+                "prefixes": sorted(
+                    {p for name in batch for p in targets[name]["prefixes"]}
+                ),
+            }
+            snapshot.load_batch(client.query(SNAPSHOT_QUERY, variables))
+        logging.info(
+            f"Loaded NetBox state for {len(names)} devices in "
+            f"{-(-len(names) // batch_size)} GraphQL queries"
+        )
+        return snapshot
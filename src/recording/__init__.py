@@ -0,0 +1,31 @@
+from .command_store import (
+    BaseCommandStore,
+    CommandRecorder,
+    FileCommandStore,
+    MongoCommandStore,
+    ReplayMissError,
+    active_recorder,
+    set_active_recorder,
+)
+from .config_archive import (
+    BaseConfigArchive,
+    DiskConfigArchive,
+    GridFSConfigArchive,
+)
+from .host_state import BaseHostStateStore, FileHostStateStore, MongoHostStateStore
+
+__all__ = [
+    "BaseCommandStore",
+    "CommandRecorder",
+    "FileCommandStore",
+    "MongoCommandStore",
+    "ReplayMissError",
+    "active_recorder",
+    "set_active_recorder",
+    "BaseConfigArchive",
+    "DiskConfigArchive",
+    "GridFSConfigArchive",
+    "BaseHostStateStore",
+    "FileHostStateStore",
+    "MongoHostStateStore",
+]
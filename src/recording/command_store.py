@@ -0,0 +1,139 @@
+import logging
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Dict, List, Literal, Optional
+import pymongo
+from nornir.core.task import Result, Task
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+class ReplayMissError(LookupError):
+    pass
+
+
+class BaseCommandStore(ABC):
+    @abstractmethod
+    def get(self, host: str, command: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def put(self, host: str, command: str, output: str) -> None:
+        pass
+
+
+class FileCommandStore(BaseCommandStore):
+    """One directory per host and one text file per command, named after
+    the command with anything but letters and digits replaced by ``_``."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    def path(self, host: str, command: str) -> str:
+        filename = re.sub(r"[^A-Za-z0-9]+", "_", command.strip()) + ".txt"
+        return os.path.join(self.directory, host, filename)
+
+    def get(self, host: str, command: str) -> Optional[str]:
+        try:
+            with open(self.path(host, command)) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, host: str, command: str, output: str) -> None:
+        path = self.path(host, command)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a replay never reads a half-written file.
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(output)
+        os.replace(tmp_path, path)
+
+
+class MongoCommandStore(BaseCommandStore):
+    def __init__(
+        self, uri: str, db_name: str, collection_name: str = "command_outputs"
+    ) -> None:
+        self.client = pymongo.MongoClient(uri)
+        self.db = self.client[db_name]
+        self.collection = self.db[collection_name]
+        self.collection.create_index([("host", 1), ("command", 1)], unique=True)
+
+    def get(self, host: str, command: str) -> Optional[str]:
+        document = self.collection.find_one({"host": host, "command": command})
+        return document["output"] if document else None
+
+    def put(self, host: str, command: str, output: str) -> None:
+        self.collection.replace_one(
+            {"host": host, "command": command},
+            {
+                "host": host,
+                "command": command,
+                "output": output,
+                "recorded": datetime.now(timezone.utc),
+            },
+            upsert=True,
+        )
+
+
+class CommandRecorder:
+    """Saves device command output to a store, or serves it back from one.
+
+    In ``record`` mode every command a task sends is written to the store
+    after it runs. In ``replay`` mode commands never reach the device; the
+    recorded output is returned instead and a missing recording fails the
+    host with ``ReplayMissError``.
+    """
+
+    def __init__(
+        self, store: BaseCommandStore, mode: Literal["record", "replay"]
+    ) -> None:
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown recording mode {mode}")
+        self.store = store
+        self.mode = mode
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == RECORD
+
+    def record(self, host: str, command: str, output: str) -> None:
+        if self.recording and isinstance(output, str):
+            self.store.put(host, command, output)
+
+    def replay(self, host: str, command: str) -> str:
+        output = self.store.get(host, command)
+        if output is None:
+            raise ReplayMissError(f"No recorded output for '{command}' on {host}")
+        return output
+
+    def replay_outputs(self, host: str, commands: List[str]) -> Dict[str, str]:
+        return {command: self.replay(host, command) for command in commands}
+
+    def replay_command(self, task: Task, command_string: str) -> Result:
+        """Nornir task standing in for ``netmiko_send_command``."""
+        return Result(
+            host=task.host, result=self.replay(task.host.name, command_string)
+        )
+
+
+_active: Optional[CommandRecorder] = None
+
+
+def active_recorder() -> Optional[CommandRecorder]:
+    return _active
+
+
+def set_active_recorder(recorder: Optional[CommandRecorder]) -> None:
+    global _active
+    _active = recorder
+    if recorder:
+        logging.info(f"Command {recorder.mode} enabled")
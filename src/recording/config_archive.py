@@ -0,0 +1,225 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+import gridfs
+import pymongo
+
+# Lines IOS rewrites on every save or clock sync; hashing them would make
+# every backup look like a change.
+VOLATILE_LINES = re.compile(
+    r"^(Building configuration|Current configuration :|"
+    r"! Last configuration change at|! NVRAM config last updated at|"
+    r"ntp clock-period )"
+)
+
+
+def normalize_config(config: str) -> str:
+    return "\n".join(
+        line.rstrip()
+        for line in config.strip().splitlines()
+        if not VOLATILE_LINES.match(line)
+    )
+
+
+def config_digest(config: str) -> str:
+    return hashlib.sha256(config.encode()).hexdigest()
+
+
+class BaseConfigArchive(ABC):
+    """Content-addressed store of device configurations.
+
+    Each distinct configuration is stored once, compressed and verbatim,
+    under its SHA-256. A run records which digest each host had, along with
+    the digest of its normalised config. A host whose normalised digest
+    matches its previous run causes no writes at all and keeps pointing at
+    its previous blob.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # Host to {"digest": raw digest, "normalized": normalised digest}.
+        self.previous: Optional[Dict[str, Dict[str, str]]] = None
+        self.current: Dict[str, Dict[str, str]] = {}
+
+    @abstractmethod
+    def has_blob(self, digest: str) -> bool:
+        pass
+
+    @abstractmethod
+    def put_blob(self, digest: str, data: bytes) -> None:
+        pass
+
+    @abstractmethod
+    def get_blob(self, digest: str) -> bytes:
+        pass
+
+    @abstractmethod
+    def write_run(self, created: datetime, pointers: Dict[str, Dict[str, str]]) -> str:
+        pass
+
+    @abstractmethod
+    def latest_pointers(self) -> Dict[str, Dict[str, str]]:
+        pass
+
+    def store(self, host: str, config: str) -> Tuple[str, bool]:
+        """Archive ``config`` for ``host``; returns the digest of the stored
+        blob and whether the config differs from the host's previous run,
+        ignoring volatile lines. An unchanged host gets its previous digest
+        back, since its new text differs at most in those lines."""
+        normalized = config_digest(normalize_config(config))
+        with self.lock:
+            if self.previous is None:
+                self.previous = self.latest_pointers()
+        previous = self.previous.get(host)
+        if previous and previous["normalized"] == normalized:
+            pointer, changed = previous, False
+        else:
+            pointer = {"digest": config_digest(config), "normalized": normalized}
+            if not self.has_blob(pointer["digest"]):
+                self.put_blob(pointer["digest"], gzip.compress(config.encode()))
+            changed = True
+        with self.lock:
+            self.current[host] = pointer
+        return pointer["digest"], changed
+
+    def record_run(self, pointers: Dict[str, str]) -> str:
+        """Record a run from host to the digest ``store`` returned."""
+        entries = {
+            host: {
+                "digest": digest,
+                "normalized": self.current.get(host, {}).get("normalized", digest),
+            }
+            for host, digest in pointers.items()
+        }
+        run_id = self.write_run(datetime.now(timezone.utc), entries)
+        self.previous = {**(self.previous or {}), **entries}
+        return run_id
+
+    def get_config(self, digest: str) -> str:
+        return gzip.decompress(self.get_blob(digest)).decode()
+
+
+class DiskConfigArchive(BaseConfigArchive):
+    """Blobs under ``objects/<2-char prefix>/<digest>.gz`` and one JSON
+    manifest per run under ``runs/``."""
+
+    def __init__(self, directory: str) -> None:
+        super().__init__()
+        self.directory = directory
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "runs"), exist_ok=True)
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest[:2], f"{digest}.gz")
+
+    def has_blob(self, digest: str) -> bool:
+        return os.path.exists(self.blob_path(digest))
+
+    def put_blob(self, digest: str, data: bytes) -> None:
+        path = self.blob_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get_blob(self, digest: str) -> bytes:
+        with open(self.blob_path(digest), "rb") as f:
+            return f.read()
+
+    def write_run(self, created: datetime, pointers: Dict[str, Dict[str, str]]) -> str:
+        run_id = created.strftime("%Y%m%dT%H%M%S%fZ")
+        path = os.path.join(self.directory, "runs", f"{run_id}.json")
+        with open(path, "w") as f:
+            json.dump({"created": created.isoformat(), "hosts": pointers}, f)
+        # A run may only cover part of the inventory, so keep a merged view
+        # of every host's latest digest alongside the per-run manifests.
+        latest = {**self.latest_pointers(), **pointers}
+        latest_path = os.path.join(self.directory, "latest.json")
+        with open(f"{latest_path}.tmp", "w") as f:
+            json.dump(latest, f)
+        os.replace(f"{latest_path}.tmp", latest_path)
+        return run_id
+
+    def latest_pointers(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(os.path.join(self.directory, "latest.json")) as f:
+                latest = json.load(f)
+        except FileNotFoundError:
+            return {}
+        # Older archives kept the normalised text under a bare digest.
+        return {
+            host: (
+                pointer
+                if isinstance(pointer, dict)
+                else {"digest": pointer, "normalized": pointer}
+            )
+            for host, pointer in latest.items()
+        }
+
+
+class GridFSConfigArchive(BaseConfigArchive):
+    def __init__(
+        self,
+        uri: str,
+        db_name: str,
+        bucket: str = "configs",
+        runs_collection: str = "config_runs",
+    ) -> None:
+        super().__init__()
+        self.client = pymongo.MongoClient(uri)
+        self.db = self.client[db_name]
+        self.fs = gridfs.GridFS(self.db, collection=bucket)
+        self.runs = self.db[runs_collection]
+        self.latest = self.db[f"{runs_collection}_latest"]
+
+    def has_blob(self, digest: str) -> bool:
+        return self.fs.exists(digest)
+
+    def put_blob(self, digest: str, data: bytes) -> None:
+        try:
+            self.fs.put(data, _id=digest, compression="gzip")
+        except gridfs.errors.FileExists:
+            pass
+
+    def get_blob(self, digest: str) -> bytes:
+        return self.fs.get(digest).read()
+
+    def write_run(self, created: datetime, pointers: Dict[str, Dict[str, str]]) -> str:
+        hosts = [{"host": host, **pointer} for host, pointer in pointers.items()]
+        run_id = str(
+            self.runs.insert_one({"created": created, "hosts": hosts}).inserted_id
+        )
+        if hosts:
+            self.latest.bulk_write(
+                [
+                    pymongo.UpdateOne(
+                        {"_id": item["host"]},
+                        {
+                            "$set": {
+                                "digest": item["digest"],
+                                "normalized": item["normalized"],
+                                "run_id": run_id,
+                            }
+                        },
+                        upsert=True,
+                    )
+                    for item in hosts
+                ]
+            )
+        return run_id
+
+    def latest_pointers(self) -> Dict[str, Dict[str, str]]:
+        return {
+            doc["_id"]: {
+                "digest": doc["digest"],
+                "normalized": doc.get("normalized", doc["digest"]),
+            }
+            for doc in self.latest.find()
+        }
@@ -0,0 +1,74 @@
+import json
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+import pymongo
+
+
+class BaseHostStateStore(ABC):
+    """Small per-host documents that carry state from one run to the next,
+    such as change markers and the results they guard."""
+
+    @abstractmethod
+    def get(self, host: str, key: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def put(self, host: str, key: str, value: Dict[str, Any]) -> None:
+        pass
+
+
+class FileHostStateStore(BaseHostStateStore):
+    """One JSON file per host and key."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, host: str, key: str) -> str:
+        return os.path.join(
+            self.directory, re.sub(r"[^A-Za-z0-9.-]+", "_", f"{host}__{key}") + ".json"
+        )
+
+    def get(self, host: str, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path(host, key)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, host: str, key: str, value: Dict[str, Any]) -> None:
+        path = self.path(host, key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+
+
+class MongoHostStateStore(BaseHostStateStore):
+    def __init__(
+        self, uri: str, db_name: str, collection_name: str = "host_state"
+    ) -> None:
+        self.client = pymongo.MongoClient(uri)
+        self.db = self.client[db_name]
+        self.collection = self.db[collection_name]
+        self.collection.create_index([("host", 1), ("key", 1)], unique=True)
+
+    def get(self, host: str, key: str) -> Optional[Dict[str, Any]]:
+        document = self.collection.find_one({"host": host, "key": key})
+        return document["value"] if document else None
+
+    def put(self, host: str, key: str, value: Dict[str, Any]) -> None:
+        self.collection.replace_one(
+            {"host": host, "key": key},
+            {
+                "host": host,
+                "key": key,
+                "value": value,
+                "updated": datetime.now(timezone.utc),
+            },
+            upsert=True,
+        )
@@ -0,0 +1,29 @@
+from .rate_limit import (
+    AdaptiveRateLimiter,
+    TokenBucket,
+    rate_limiter,
+    rate_limiters,
+    set_rate_limiter,
+)
+from .retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudget,
+    RetryPolicy,
+    active_retry_policy,
+    set_active_retry_policy,
+)
+
+__all__ = [
+    "AdaptiveRateLimiter",
+    "TokenBucket",
+    "rate_limiter",
+    "rate_limiters",
+    "set_rate_limiter",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "RetryBudget",
+    "RetryPolicy",
+    "active_retry_policy",
+    "set_active_retry_policy",
+]
@@ -0,0 +1,240 @@
+import logging
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def configured_rate(api: str, kind: str) -> Optional[float]:
+    """Requests per second from e.g. NETBOX_WRITE_RATE, or None when unset.
+    The Meraki dashboard allows 10 requests per second per organisation
+    across reads and writes."""
+    value = os.getenv(f"{api.upper()}_{kind.upper()}_RATE")
+    return float(value) if value else None
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket. Callers reserve a token and sleep off any
+    deficit outside the lock, so waiting threads are served in order.
+
+    A ``rate`` of None is unlimited: ``acquire`` returns at once, and only
+    tracks the call rate so a limit can start from it.
+    """
+
+    def __init__(
+        self, rate: Optional[float] = None, capacity: Optional[float] = None
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = self.burst()
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.window_start = self.updated
+        self.window_calls = 0
+        self.observed_rate = 0.0
+        self.lock = threading.Lock()
+
+    def burst(self) -> float:
+        return self.capacity or max(self.rate or 1.0, 1.0)
+
+    def track(self, now: float) -> None:
+        if now - self.window_start >= 1.0:
+            self.observed_rate = self.window_calls / (now - self.window_start)
+            self.window_start = now
+            self.window_calls = 0
+        self.window_calls += 1
+
+    def recent_rate(self) -> float:
+        with self.lock:
+            elapsed = time.monotonic() - self.window_start
+            current = self.window_calls / max(elapsed, 0.1)
+            return max(self.observed_rate, current)
+
+    def refill(self, now: float) -> None:
+        # No tokens accrue while paused, so a Retry-After is not followed
+        # by a full burst.
+        start = max(self.updated, self.paused_until)
+        if self.rate is not None and now > start:
+            self.tokens = min(self.burst(), self.tokens + (now - start) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        """Take a token, sleeping until it is available; returns the time
+        spent waiting."""
+        with self.lock:
+            now = time.monotonic()
+            self.track(now)
+            if self.rate is None:
+                return 0.0
+            self.refill(now)
+            self.tokens -= 1
+            wait = max(self.paused_until - now, 0.0) + max(
+                -self.tokens / self.rate, 0.0
+            )
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        with self.lock:
+            now = time.monotonic()
+            self.refill(now)
+            self.paused_until = max(self.paused_until, now + seconds)
+
+    def set_rate(self, rate: Optional[float]) -> None:
+        with self.lock:
+            now = time.monotonic()
+            self.refill(now)
+            if self.rate is None and rate is not None:
+                # Limiting starts because the server pushed back, so
+                # without a burst allowance.
+                self.tokens = 0.0
+            self.rate = rate
+            self.tokens = min(self.tokens, self.burst())
+
+
+class AdaptiveRateLimiter:
+    """Separate read and write token buckets for one API, shared by every
+    client of that API in the process.
+
+    Buckets without a configured rate are unlimited until the server
+    pushes back. A 429 or 503 halves the bucket's rate, starting from the
+    recent call rate when it had none, and pauses it for the Retry-After.
+    A response slower than ``target_latency`` trims a limited rate by a
+    tenth. Each fast success adds ``increase`` requests per second back,
+    up to the configured rate; an unconfigured bucket that climbs back to
+    the rate it was throttled at is unlimited again.
+    """
+
+    def __init__(
+        self,
+        api: str,
+        read_rate: Optional[float] = None,
+        write_rate: Optional[float] = None,
+        min_rate: float = 1.0,
+        target_latency: float = 2.0,
+        increase: float = 1.0,
+        default_pause: float = 1.0,
+    ) -> None:
+        self.api = api
+        self.max_rates = {"read": read_rate, "write": write_rate}
+        self.ceilings = dict(self.max_rates)
+        self.buckets = {
+            kind: TokenBucket(rate) for kind, rate in self.max_rates.items()
+        }
+        self.min_rate = min_rate
+        self.target_latency = target_latency
+        self.increase = increase
+        self.default_pause = default_pause
+        self.lock = threading.Lock()
+        self.throttled_seconds = {"read": 0.0, "write": 0.0}
+        self.throttled_calls = {"read": 0, "write": 0}
+        self.rate_limited = 0
+
+    @staticmethod
+    def kind(method: str) -> str:
+        return "read" if method.upper() in READ_METHODS else "write"
+
+    def acquire(self, method: str) -> float:
+        kind = self.kind(method)
+        waited = self.buckets[kind].acquire()
+        if waited:
+            with self.lock:
+                self.throttled_seconds[kind] += waited
+                self.throttled_calls[kind] += 1
+        return waited
+
+    def observe(
+        self,
+        method: str,
+        status: int,
+        latency: float,
+        retry_after: Optional[str] = None,
+    ) -> None:
+        kind = self.kind(method)
+        bucket = self.buckets[kind]
+        if status in (429, 503):
+            current = bucket.rate
+            if current is None:
+                current = max(bucket.recent_rate(), self.min_rate)
+                self.ceilings[kind] = current
+            rate = max(self.min_rate, current / 2)
+            bucket.set_rate(rate)
+            pause = retry_after_seconds(retry_after)
+            bucket.pause(self.default_pause if pause is None else pause)
+            with self.lock:
+                self.rate_limited += 1
+            logging.warning(
+                f"{self.api} returned {status}; {kind} rate lowered to {rate:.1f}/s"
+            )
+            return
+        if bucket.rate is None:
+            return
+        if latency > self.target_latency:
+            rate = max(self.min_rate, bucket.rate * 0.9)
+        elif status < 400:
+            rate = bucket.rate + self.increase
+            if rate >= self.ceilings[kind]:
+                rate = self.max_rates[kind]
+        else:
+            return
+        if rate != bucket.rate:
+            bucket.set_rate(rate)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "rates": {kind: bucket.rate for kind, bucket in self.buckets.items()},
+            "throttled_seconds": dict(self.throttled_seconds),
+            "throttled_calls": dict(self.throttled_calls),
+            "rate_limited_responses": self.rate_limited,
+        }
+
+
+def format_rate(rate: Optional[float]) -> str:
+    return "unlimited" if rate is None else f"{rate:.1f}/s"
+
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_lock = threading.Lock()
+
+
+def rate_limiter(api: str) -> AdaptiveRateLimiter:
+    """The process-wide limiter for ``api``, created on first use with the
+    rates configured in the environment, if any."""
+    with _lock:
+        limiter = _limiters.get(api)
+        if limiter is None:
+            limiter = _limiters[api] = AdaptiveRateLimiter(
+                api, configured_rate(api, "read"), configured_rate(api, "write")
+            )
+        return limiter
+
+
+def set_rate_limiter(api: str, limiter: Optional[AdaptiveRateLimiter]) -> None:
+    with _lock:
+        if limiter is None:
+            _limiters.pop(api, None)
+        else:
+            _limiters[api] = limiter
+
+
+def rate_limiters() -> Dict[str, AdaptiveRateLimiter]:
+    with _lock:
+        return dict(_limiters)
@@ -0,0 +1,246 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Type
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class RetryBudget:
+    """Retries shared by every worker in a run, so a widespread outage
+    cannot multiply the run's length by the per-call attempt count."""
+
+    def __init__(self, max_retries: int) -> None:
+        self.max_retries = max_retries
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self.lock:
+            if self.used >= self.max_retries:
+                return False
+            self.used += 1
+            return True
+
+    def reset(self) -> None:
+        with self.lock:
+            self.used = 0
+
+
+class CircuitBreaker:
+    """Opens a key after ``threshold`` consecutive failures; an open key
+    stays open for the rest of the run.
+
+    With a ``window`` in seconds, failures are counted over that window
+    instead, and a key only opens once it has seen ``threshold`` failures
+    and no success for a whole window. That suits keys shared by many
+    threads, where a brief outage produces one failure per thread at once.
+    """
+
+    def __init__(self, threshold: int, window: Optional[float] = None) -> None:
+        self.threshold = threshold
+        self.window = window
+        self.failures: Dict[str, int] = {}
+        self.failure_times: Dict[str, Deque[float]] = {}
+        self.first_failure: Dict[str, float] = {}
+        self.open: Dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    def is_open(self, key: str) -> bool:
+        return key in self.open
+
+    def record_success(self, key: str) -> None:
+        with self.lock:
+            self.failures[key] = 0
+            self.failure_times.pop(key, None)
+            self.first_failure.pop(key, None)
+
+    def record_failure(self, key: str, error: str) -> bool:
+        with self.lock:
+            if key in self.open:
+                return False
+            if self.window is None:
+                self.failures[key] = self.failures.get(key, 0) + 1
+                if self.failures[key] < self.threshold:
+                    return False
+            elif not self.window_failed(key, time.monotonic()):
+                return False
+            self.open[key] = error
+        if self.window is None:
+            logging.warning(
+                f"Circuit opened for {key} after {self.threshold} consecutive "
+                f"failures: {error}"
+            )
+        else:
+            logging.warning(
+                f"Circuit opened for {key} after failing for {self.window:g}s: "
+                f"{error}"
+            )
+        return True
+
+    def window_failed(self, key: str, now: float) -> bool:
+        times = self.failure_times.setdefault(key, deque())
+        times.append(now)
+        while times[0] < now - self.window:
+            times.popleft()
+        started = self.first_failure.setdefault(key, now)
+        return len(times) >= self.threshold and now - started >= self.window
+
+    def reset(self) -> None:
+        with self.lock:
+            self.failures = {}
+            self.failure_times = {}
+            self.first_failure = {}
+            self.open = {}
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, a per-run retry budget and
+    circuit breakers per host and per site.
+
+    Calls are made against a list of breaker keys such as ``host:sw01`` and
+    ``site:S01``; once any of them is open further calls fail immediately
+    with ``CircuitOpenError`` instead of waiting on a dead device or site.
+    API keys are shared by every worker, so their breaker is time-windowed
+    rather than counting consecutive failures.
+    """
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 10.0,
+        retry_budget: int = 100,
+        host_failure_threshold: int = 3,
+        site_failure_threshold: int = 5,
+        api_failure_threshold: int = 5,
+        api_failure_window: float = 30.0,
+        site_field: str = "site_id",
+    ) -> None:
+        self.attempts = max(attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = RetryBudget(retry_budget)
+        self.breakers = {
+            "host": CircuitBreaker(host_failure_threshold),
+            "site": CircuitBreaker(site_failure_threshold),
+            "api": CircuitBreaker(api_failure_threshold, api_failure_window),
+        }
+        self.site_field = site_field
+
+    def reset(self) -> None:
+        self.budget.reset()
+        for breaker in self.breakers.values():
+            breaker.reset()
+
+    def host_keys(self, host: Any) -> List[str]:
+        keys = [f"host:{host.name}"]
+        site = host.get(self.site_field)
+        if site:
+            keys.append(f"site:{site}")
+        return keys
+
+    def breaker(self, key: str) -> CircuitBreaker:
+        return self.breakers[key.split(":", 1)[0]]
+
+    def check(self, keys: List[str]) -> None:
+        for key in keys:
+            breaker = self.breaker(key)
+            if breaker.is_open(key):
+                raise CircuitOpenError(f"Circuit open for {key}: {breaker.open[key]}")
+
+    def record(self, keys: List[str], error: Optional[str] = None) -> None:
+        """Record the outcome of a call made outside ``call``, such as an
+        asyncio connect, against ``keys``."""
+        for key in keys:
+            if error is None:
+                self.breaker(key).record_success(key)
+            else:
+                self.breaker(key).record_failure(key, error)
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def call(
+        self,
+        fn: Callable[[], Any],
+        keys: List[str],
+        retry_on: Tuple[Type[BaseException], ...],
+        give_up_on: Tuple[Type[BaseException], ...] = (),
+        failed_result: Optional[Callable[[Any], bool]] = None,
+        throttled_result: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """Call ``fn`` until it succeeds, the attempts or the shared budget
+        run out, or one of ``keys`` opens. ``failed_result`` marks returned
+        values (an HTTP 503, say) to be retried like an exception; the last
+        such value is returned rather than raised. ``throttled_result``
+        marks values (an HTTP 429) that are retried without counting
+        against the circuit breakers, since the server is up but busy."""
+        self.check(keys)
+        for attempt in range(self.attempts):
+            error = None
+            try:
+                result = fn()
+            except give_up_on:
+                raise
+            except retry_on as e:
+                error = e
+                reason = str(e) or type(e).__name__
+            else:
+                if failed_result is None or not failed_result(result):
+                    for key in keys:
+                        self.breaker(key).record_success(key)
+                    return result
+                reason = f"unsuccessful result {result}"
+                if throttled_result is not None and throttled_result(result):
+                    if attempt == self.attempts - 1 or not self.budget.acquire():
+                        return result
+                    delay = self.backoff(attempt)
+                    logging.info(f"Retrying {keys[0]} in {delay:.2f}s after: {reason}")
+                    time.sleep(delay)
+                    continue
+            # Host and API keys count every failed attempt; a site counts a
+            # failure once per call that gives up, i.e. once per bad host.
+            opened = [
+                key
+                for key in keys
+                if not key.startswith("site:")
+                and self.breaker(key).record_failure(key, reason)
+            ]
+            if opened or attempt == self.attempts - 1 or not self.budget.acquire():
+                for key in keys:
+                    if key.startswith("site:"):
+                        self.breaker(key).record_failure(key, reason)
+                if error is not None:
+                    raise error
+                return result
+            delay = self.backoff(attempt)
+            logging.info(f"Retrying {keys[0]} in {delay:.2f}s after: {reason}")
+            time.sleep(delay)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "retries_used": self.budget.used,
+            "retry_budget": self.budget.max_retries,
+            "open_circuits": {
+                key: error
+                for breaker in self.breakers.values()
+                for key, error in breaker.open.items()
+            },
+        }
+
+
+_active: Optional[RetryPolicy] = None
+
+
+def active_retry_policy() -> Optional[RetryPolicy]:
+    return _active
+
+
+def set_active_retry_policy(policy: Optional[RetryPolicy]) -> None:
+    global _active
+    _active = policy
@@ -0,0 +1,3 @@
+from .result_table import Column, ResultTable, to_dataframe, to_records
+
+__all__ = ["Column", "ResultTable", "to_dataframe", "to_records"]
@@ -0,0 +1,132 @@
+import sys
+from array import array
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Sequence, Union
+import numpy as np
+import pandas as pd
+
+
+class Column:
+    """Dictionary-encoded column: each distinct value is stored once and rows
+    hold a 4-byte code into it. Strings are interned as they are added."""
+
+    __slots__ = ("codes", "values", "index")
+
+    def __init__(self) -> None:
+        self.codes = array("I")
+        self.values: List[Hashable] = []
+        self.index: Dict[Any, int] = {}
+
+    def append(self, value: Hashable) -> None:
+        # Keyed by type as well, so 1 and True stay distinct values.
+        key = (value.__class__, value)
+        try:
+            code = self.index.get(key)
+        except TypeError:
+            # Unhashable values (lists, dicts) are stored per row.
+            code = len(self.values)
+            self.values.append(value)
+        else:
+            if code is None:
+                if isinstance(value, str):
+                    value = sys.intern(value)
+                code = self.index[key] = len(self.values)
+                self.values.append(value)
+        self.codes.append(code)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, i: int) -> Hashable:
+        return self.values[self.codes[i]]
+
+    def __iter__(self) -> Iterator[Hashable]:
+        values = self.values
+        return (values[code] for code in self.codes)
+
+    def to_series(self, name: str) -> pd.Series:
+        codes = np.frombuffer(self.codes, dtype=np.uint32).astype(np.int64)
+        try:
+            categorical = pd.Categorical.from_codes(codes, pd.Index(self.values))
+        except (TypeError, ValueError):
+            # Nulls, unhashable or pandas-equal values (1 and True) cannot be
+            # categories; fall back to a plain object column.
+            return pd.Series([self.values[code] for code in codes], name=name)
+        return pd.Series(categorical, name=name)
+
+
+class ResultTable:
+    """Columnar task results.
+
+    Holds the same rows as the list of dicts tasks used to return, but as
+    one dictionary-encoded column per key, so repeated host names and
+    interface names cost a 4-byte code per row. Iterating yields row dicts
+    built on the fly, so consumers that expect records keep working;
+    ``to_dataframe`` builds categorical columns straight from the codes.
+    """
+
+    def __init__(self, columns: Sequence[str]) -> None:
+        self.columns: Dict[str, Column] = {name: Column() for name in columns}
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "ResultTable":
+        records = list(records)
+        columns: Dict[str, None] = {}
+        for record in records:
+            columns.update(dict.fromkeys(record))
+        table = cls(list(columns))
+        table.extend(records)
+        return table
+
+    @classmethod
+    def concat(cls, tables: Iterable["ResultTable"]) -> "ResultTable":
+        tables = list(tables)
+        columns: Dict[str, None] = {}
+        for table in tables:
+            columns.update(dict.fromkeys(table.columns))
+        result = cls(list(columns))
+        for table in tables:
+            result.extend(table)
+        return result
+
+    def append(self, **row: Any) -> None:
+        self.append_row(row)
+
+    def append_row(self, row: Dict[str, Any]) -> None:
+        for name, column in self.columns.items():
+            column.append(row.get(name))
+
+    def extend(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.append_row(row)
+
+    def column(self, name: str) -> List[Any]:
+        return list(self.columns[name])
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()), ()))
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        return {name: column[i] for name, column in self.columns.items()}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        names = list(self.columns)
+        return (
+            dict(zip(names, values))
+            for values in zip(*(iter(c) for c in self.columns.values()))
+        )
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {name: column.to_series(name) for name, column in self.columns.items()}
+        )
+
+
+def to_records(data: Union[List[Dict[str, Any]], ResultTable]) -> List[Dict[str, Any]]:
+    return data.to_records() if isinstance(data, ResultTable) else data
+
+
+def to_dataframe(data: Union[List[Dict[str, Any]], ResultTable]) -> pd.DataFrame:
+    return data.to_dataframe() if isinstance(data, ResultTable) else pd.DataFrame(data)
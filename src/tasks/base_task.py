@@ -1,7 +1,50 @@
+import hashlib
+import os
+import re
+import tempfile
 from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
 from nornir.core import Nornir
+from nornir.core.inventory import Host
+from nornir.core.task import MultiResult, Task
+from nornir_netmiko.tasks import netmiko_file_transfer, netmiko_send_command
+from netmiko.exceptions import NetmikoAuthenticationException, NetmikoTimeoutException
+from paramiko.ssh_exception import SSHException
+from ntc_templates.parse import parse_output
+from src.collection.backends import CliBackend, CollectionBackend
+from src.instrumentation.timing import RUN, active_timer, current_host
+from src.recording.command_store import active_recorder
+from src.recording.host_state import BaseHostStateStore
+from src.resilience.retry import RetryPolicy, active_retry_policy
+
+CONNECT_ERRORS = (NetmikoTimeoutException, SSHException, OSError, EOFError)
+
+
+class ConfigPushError(Exception):
+    pass
+
+
+def output_digest(outputs: Dict[str, str]) -> str:
+    digest = hashlib.sha256()
+    for command in sorted(outputs):
+        digest.update(f"{command}\0{outputs[command]}\0".encode())
+    return digest.hexdigest()
+
 
 class BaseTask(ABC):
+    # When set, per-host output hashes are kept here so output identical to
+    # the previous run skips downstream processing.
+    state_store: Optional[BaseHostStateStore] = None
+    # When set, parses of parse_cache_commands are kept here, apart from
+    # the task state above, and reused while the raw output is unchanged.
+    parse_cache: Optional[BaseHostStateStore] = None
+    # Only commands whose output is stable between polls are worth caching;
+    # "show interface" counters and the "show version" uptime would miss on
+    # every run and rewrite the cached table each time.
+    parse_cache_commands = frozenset({"show dot1x all", "show vlan brief", "show vrf"})
+    # Collection backend per Nornir platform; other platforms use the CLI.
+    backends: Optional[Dict[str, CollectionBackend]] = None
+
     @abstractmethod
     def propose(self, nr: Nornir) -> list:
         pass
@@ -9,3 +52,123 @@ class BaseTask(ABC):
     @abstractmethod
     def apply(self, nr: Nornir) -> list:
         pass
+
+    def backend(self, host: Host) -> CollectionBackend:
+        backends = self.backends or {}
+        return backends.get(host.platform) or CliBackend(self)
+
+    def send_command(self, task: Task, command: str) -> MultiResult:
+        timer = active_timer()
+        recorder = active_recorder()
+        if recorder and recorder.replaying:
+            with timer.phase("command", task.host.name):
+                return task.run(task=recorder.replay_command, command_string=command)
+        policy = active_retry_policy()
+        if policy:
+            policy.check(policy.host_keys(task.host))
+        if "netmiko" not in task.host.connections:
+            with timer.phase("connect", task.host.name):
+                self.open_connection(task, policy)
+        with timer.phase("command", task.host.name):
+            result = task.run(task=netmiko_send_command, command_string=command)
+        if recorder:
+            recorder.record(task.host.name, command, result.result)
+        return result
+
+    def open_connection(self, task: Task, policy: Optional[RetryPolicy]) -> None:
+        def connect() -> None:
+            task.host.get_connection("netmiko", task.nornir.config)
+
+        if policy is None:
+            return connect()
+        policy.call(
+            connect,
+            policy.host_keys(task.host),
+            retry_on=CONNECT_ERRORS,
+            give_up_on=(NetmikoAuthenticationException,),
+        )
+
+    def push_config_file(
+        self,
+        task: Task,
+        commands: List[str],
+        file_system: str = "flash:",
+        read_timeout: float = 300.0,
+    ) -> Dict[str, Any]:
+        """Push ``commands`` as one file instead of line by line.
+
+        The rendered config is copied to ``file_system`` over SCP, checked
+        against its local MD5, merged with a single ``copy`` to
+        running-config and then deleted. Returns the checksum, the copy
+        output and any ``%`` error lines the device printed while merging.
+        The device needs ``ip scp server enable``.
+        """
+        config = "\n".join(commands) + "\nend\n"
+        checksum = hashlib.md5(config.encode()).hexdigest()
+        dest_file = f"net-task-{checksum[:12]}.cfg"
+        timer = active_timer()
+        with tempfile.TemporaryDirectory() as directory:
+            source_file = os.path.join(directory, dest_file)
+            with open(source_file, "w") as f:
+                f.write(config)
+            with timer.phase("file_transfer", task.host.name):
+                transfer = task.run(
+                    task=netmiko_file_transfer,
+                    source_file=source_file,
+                    dest_file=dest_file,
+                    file_system=file_system,
+                    overwrite_file=True,
+                )
+        if not transfer.result:
+            raise ConfigPushError(
+                f"{file_system}{dest_file} failed MD5 verification on {task.host.name}"
+            )
+
+        connection = task.host.get_connection("netmiko", task.nornir.config)
+        prompt = rf"{re.escape(connection.base_prompt)}[>#]"
+        with timer.phase("config_merge", task.host.name):
+            output = connection.send_command(
+                f"copy {file_system}{dest_file} running-config",
+                expect_string=rf"running-config\]\?|{prompt}",
+                read_timeout=read_timeout,
+            )
+            if "running-config]?" in output:
+                # Without "file prompt quiet" IOS asks to confirm the target.
+                output += connection.send_command(
+                    "\n", expect_string=prompt, read_timeout=read_timeout
+                )
+            connection.send_command(
+                f"delete /force {file_system}{dest_file}", expect_string=prompt
+            )
+        errors = [line for line in output.splitlines() if line.startswith("%")]
+        return {"checksum": checksum, "output": output, "errors": errors}
+
+    def parse_output(self, platform: str, command: str, data: str) -> Any:
+        host = current_host()
+        if (
+            self.parse_cache is None
+            or host == RUN
+            or command not in self.parse_cache_commands
+        ):
+            with active_timer().phase("parse"):
+                return parse_output(platform=platform, command=command, data=data)
+        key = f"parsed {command}"
+        digest = output_digest({command: data})
+        stored = self.parse_cache.get(host, key)
+        if stored and stored["digest"] == digest:
+            active_timer().count("parse_skipped")
+            return stored["parsed"]
+        with active_timer().phase("parse"):
+            parsed = parse_output(platform=platform, command=command, data=data)
+        self.parse_cache.put(host, key, {"digest": digest, "parsed": parsed})
+        return parsed
+
+    def outputs_unchanged(self, host: str, key: str, outputs: Dict[str, str]) -> bool:
+        if self.state_store is None:
+            return False
+        stored = self.state_store.get(host, key)
+        return bool(stored) and stored["digest"] == output_digest(outputs)
+
+    def remember_outputs(self, host: str, key: str, outputs: Dict[str, str]) -> None:
+        if self.state_store is not None:
+            self.state_store.put(host, key, {"digest": output_digest(outputs)})
@@ -1,16 +1,29 @@
 import logging
 import time
-from typing import List, Any
-from nornir_netmiko.tasks import netmiko_send_command, netmiko_send_config
+from typing import List, Any, Dict, Optional
+from nornir_netmiko.tasks import netmiko_send_config
 from nornir_utils.plugins.functions import print_result
-from ntc_templates.parse import parse_output
 from netutils.interface import abbreviated_interface_name
 from nornir.core import Nornir
+from nornir.core.inventory import Host
 from nornir.core.task import Task, Result
+from src.collection.backends import CollectionBackend
+from src.recording.host_state import BaseHostStateStore
+from src.results.result_table import ResultTable
 from .base_task import BaseTask
 
 
 class BouncePortsTask(BaseTask):
+    collection_commands = ["show vlan brief", "show dot1x all"]
+
+    def __init__(
+        self,
+        parse_cache: Optional[BaseHostStateStore] = None,
+        backends: Optional[Dict[str, CollectionBackend]] = None,
+    ) -> None:
+        self.parse_cache = parse_cache
+        self.backends = backends
+
     def propose(self, nr: Nornir) -> list:
         logging.info(
             "Getting interfaces on VLAN 21 with dot1x configured (Proposal)..."
@@ -29,27 +42,36 @@ class BouncePortsTask(BaseTask):
         return self.collect_results(nr)
 
     def get_vlan_21_dot1x_interfaces(self, task: Task) -> Result:
-        vlan_result = task.run(
-            task=netmiko_send_command, command_string="show vlan brief"
-        )
-        vlan_interfaces = self.parse_vlan_output(vlan_result.result)
-
-        dot1x_result = task.run(
-            task=netmiko_send_command, command_string="show dot1x all"
-        )
-        dot1x_interfaces = self.parse_dot1x_output(dot1x_result.result)
-        flat_vlan_interfaces = self.remove_outer_list(vlan_interfaces)
-        task.host["bounce_ports"] = list(
-            set(flat_vlan_interfaces) & set(dot1x_interfaces)
-        )
+        backend = self.backend(task.host)
+        if backend.name == "cli":
+            outputs = {
+                command: self.send_command(task, command).result
+                for command in self.collection_commands
+            }
+            self.process_collected(task.host, outputs)
+        else:
+            # No structured getter covers dot1x, so it stays on the CLI.
+            dot1x_interfaces = self.parse_dot1x_output(
+                self.send_command(task, "show dot1x all").result
+            )
+            vlan_interfaces = backend.vlans(task).get("21", [])
+            task.host["bounce_ports"] = list(
+                set(vlan_interfaces) & set(dot1x_interfaces)
+            )
         return Result(
             host=task.host,
             result=f"Identified bounce ports: {task.host['bounce_ports']}",
             failed=False,
         )
 
+    def process_collected(self, host: Host, outputs: Dict[str, str]) -> None:
+        vlan_interfaces = self.parse_vlan_output(outputs["show vlan brief"])
+        dot1x_interfaces = self.parse_dot1x_output(outputs["show dot1x all"])
+        flat_vlan_interfaces = self.remove_outer_list(vlan_interfaces)
+        host["bounce_ports"] = list(set(flat_vlan_interfaces) & set(dot1x_interfaces))
+
     def parse_vlan_output(self, output: str) -> List[str]:
-        parsed_output = parse_output(
+        parsed_output = self.parse_output(
             platform="cisco_ios", command="show vlan brief", data=output
         )
         interfaces = []
@@ -59,7 +81,7 @@ class BouncePortsTask(BaseTask):
         return interfaces
 
     def parse_dot1x_output(self, output: str) -> List[str]:
-        parsed_output = parse_output(
+        parsed_output = self.parse_output(
             platform="cisco_ios", command="show dot1x all", data=output
         )
         interfaces = [
@@ -78,12 +100,12 @@ class BouncePortsTask(BaseTask):
                 flat_list.append(item)
         return flat_list
 
-    def collect_results(self, nr: Nornir) -> List[dict]:
-        data = []
+    def collect_results(self, nr: Nornir) -> ResultTable:
+        data = ResultTable(["host", "interface"])
         for host in nr.inventory.hosts.values():
             if "bounce_ports" in host.keys():
                 for interface in host["bounce_ports"]:
-                    data.append({"host": host.name, "interface": interface})
+                    data.append(host=host.name, interface=interface)
         return data
 
     def generate_bounce_commands(self, interface: str) -> List[str]:
@@ -1,35 +1,165 @@
 from .base_task import BaseTask
-from nornir_netmiko.tasks import netmiko_send_config
+from nornir_netmiko.tasks import netmiko_save_config, netmiko_send_config
 from nornir_utils.plugins.functions import print_result
 from nornir.core import Nornir
+from nornir.core.task import Result, Task
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import json
 import logging
+from src.config_diff.config_tree import ConfigTree
+from src.recording.config_archive import config_digest, normalize_config
+from src.results.result_table import ResultTable
 
 
 class ConfigTask(BaseTask):
-    def execute(self, nr: Nornir) -> list:
-        logging.info("Printing proposed configuration...")
-        nr.run(task=self.print_proposed_configuration)
-        input("Press Enter to apply the configuration...")
+    """Pushes the dot1x authentication order to ``dot1x_interfaces``.
+
+    ``propose`` computes each host's delta against its running config and,
+    given a ``plan_file``, writes it there for review. ``apply`` pushes the
+    plan file's commands when one exists, otherwise a freshly computed
+    delta, as a single config session per host. The plan records a digest
+    of each host's running config, and a host whose config has changed
+    since is refused rather than sent a stale delta. The config is only
+    written to startup with ``save=True``.
+
+    With ``push_mode="file"`` the commands are sent as one file over SCP
+    and merged with a single copy to running-config, rather than typed
+    line by line, which is much faster for large changes.
+    """
+
+    def __init__(
+        self,
+        plan_file: Optional[str] = None,
+        save: bool = False,
+        push_mode: str = "lines",
+        file_system: str = "flash:",
+    ) -> None:
+        if push_mode not in ("lines", "file"):
+            raise ValueError(f"Unknown push mode: {push_mode}")
+        self.plan_file = plan_file
+        self.save = save
+        self.push_mode = push_mode
+        self.file_system = file_system
+
+    def propose(self, nr: Nornir) -> list:
+        logging.info("Computing configuration delta...")
+        result = nr.run(task=self.compute_configuration_delta)
+        print_result(result, failed=True)
+        self.print_proposed_configuration(nr)
+        if self.plan_file:
+            self.write_plan(nr)
+        return self.collect_results(nr)
+
+    def apply(self, nr: Nornir) -> list:
+        if self.plan_file:
+            self.load_plan(nr)
+        else:
+            logging.info("No plan file given, computing configuration delta...")
+            nr.run(task=self.compute_configuration_delta)
         logging.info("Applying configuration...")
         result = nr.run(task=self.apply_configuration)
         print_result(result)
         return self.collect_results(nr)
 
-    def print_proposed_configuration(self, task) -> None:
-        if "dot1x_interfaces" in task.host.keys():
-            for interface in task.host["dot1x_interfaces"]:
-                commands = self.generate_configuration_commands(interface)
-                print(
-                    f"Proposed configuration for {task.host.name} on interface {interface}:"
+    def compute_configuration_delta(self, task: Task) -> None:
+        if "dot1x_interfaces" not in task.host.keys():
+            return
+        running_config = self.send_command(task, "show running-config").result
+        task.host["running_config_digest"] = config_digest(
+            normalize_config(running_config)
+        )
+        tree = ConfigTree.from_config(running_config)
+        task.host["config_delta"] = tree.delta(self.candidate_commands(task.host))
+
+    def candidate_commands(self, host) -> List[str]:
+        commands = []
+        for interface in host["dot1x_interfaces"]:
+            commands.extend(self.generate_configuration_commands(interface))
+        return commands
+
+    def write_plan(self, nr: Nornir) -> None:
+        plan = {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "hosts": {
+                host.name: {
+                    "digest": host["running_config_digest"],
+                    "commands": host["config_delta"],
+                }
+                for host in nr.inventory.hosts.values()
+                if host.get("config_delta")
+            },
+        }
+        with open(self.plan_file, "w") as f:
+            json.dump(plan, f, indent=2)
+        logging.info(f"Wrote plan for {len(plan['hosts'])} hosts to {self.plan_file}")
+
+    def load_plan(self, nr: Nornir) -> None:
+        with open(self.plan_file) as f:
+            plan: Dict[str, Any] = json.load(f)
+        logging.info(f"Applying plan {self.plan_file} created {plan['created']}")
+        for host in nr.inventory.hosts.values():
+            entry = plan["hosts"].get(host.name)
+            if entry is None:
+                host["config_delta"] = []
+                continue
+            # Plans written before digests were recorded carry a bare list
+            # of commands and cannot be checked, so they are refused.
+            if isinstance(entry, list):
+                entry = {"digest": None, "commands": entry}
+            host["config_delta"] = entry["commands"]
+            host["planned_digest"] = entry["digest"]
+        missing = set(plan["hosts"]) - set(nr.inventory.hosts)
+        if missing:
+            logging.warning(f"Plan hosts not in inventory: {sorted(missing)}")
+
+    def print_proposed_configuration(self, nr: Nornir) -> None:
+        for host in nr.inventory.hosts.values():
+            if "config_delta" not in host.keys():
+                continue
+            if not host["config_delta"]:
+                print(f"{host.name} already has the proposed configuration")
+                continue
+            print(f"Proposed configuration for {host.name}:")
+            for command in host["config_delta"]:
+                print(command)
+
+    def apply_configuration(self, task: Task) -> Result:
+        commands = task.host.get("config_delta")
+        if not commands:
+            return Result(host=task.host, result="No changes")
+        if "planned_digest" in task.host.keys():
+            stale = self.check_plan_freshness(task)
+            if stale:
+                return Result(host=task.host, result=stale, failed=True)
+        if self.push_mode == "file":
+            push = self.push_config_file(task, commands, self.file_system)
+            task.host["config_checksum"] = push["checksum"]
+            if push["errors"]:
+                return Result(
+                    host=task.host,
+                    result="\n".join(push["errors"]),
+                    changed=True,
+                    failed=True,
                 )
-                for command in commands:
-                    print(command)
+        else:
+            task.run(task=netmiko_send_config, config_commands=commands)
+        if self.save:
+            task.run(task=netmiko_save_config)
+        return Result(
+            host=task.host, result=f"Applied {len(commands)} lines", changed=True
+        )
 
-    def apply_configuration(self, task) -> None:
-        if "dot1x_interfaces" in task.host.keys():
-            for interface in task.host["dot1x_interfaces"]:
-                commands = self.generate_configuration_commands(interface)
-                task.run(task=netmiko_send_config, config_commands=commands)
+    def check_plan_freshness(self, task: Task) -> Optional[str]:
+        """Return why the plan no longer fits the host's running config, or
+        None when the config is unchanged since the plan was made."""
+        planned = task.host["planned_digest"]
+        if planned is None:
+            return "Plan has no config digest for this host; re-run propose"
+        running_config = self.send_command(task, "show running-config").result
+        if config_digest(normalize_config(running_config)) != planned:
+            return "Running config changed since the plan was made; re-run propose"
+        return None
 
     def generate_configuration_commands(self, interface: str) -> list:
         return [
@@ -38,10 +168,10 @@ class ConfigTask(BaseTask):
             " authentication priority mab dot1x",
         ]
 
-    def collect_results(self, nr: Nornir) -> list:
-        data = []
+    def collect_results(self, nr: Nornir) -> ResultTable:
+        data = ResultTable(["host", "interface"])
         for host in nr.inventory.hosts.values():
             if "dot1x_interfaces" in host.keys():
                 for interface in host["dot1x_interfaces"]:
-                    data.append({"host": host.name, "interface": interface})
+                    data.append(host=host.name, interface=interface)
         return data
@@ -1,36 +1,82 @@
 from .base_task import BaseTask
-from nornir_netmiko.tasks import netmiko_send_command
 from nornir_utils.plugins.functions import print_result
-from ntc_templates.parse import parse_output
 from nornir.core import Nornir
+from nornir.core.inventory import Host
+from typing import Dict, Optional
 import logging
+from src.recording.host_state import BaseHostStateStore
+from src.results.result_table import ResultTable
 
 class DiscoveryTask(BaseTask):
+    collection_commands = ["show dot1x all"]
+    change_marker_command = "show running-config | include Last configuration change"
+
+    def __init__(
+        self,
+        state_store: Optional[BaseHostStateStore] = None,
+        parse_cache: Optional[BaseHostStateStore] = None,
+    ) -> None:
+        # With a state store, hosts whose config has not changed since the
+        # last run reuse their stored result instead of being collected.
+        self.state_store = state_store
+        self.parse_cache = parse_cache
+
+    def propose(self, nr: Nornir) -> list:
+        return self.execute(nr)
+
+    def apply(self, nr: Nornir) -> list:
+        return self.execute(nr)
+
     def execute(self, nr: Nornir) -> list:
         logging.info("Getting dot1x-enabled interfaces...")
         result = nr.run(task=self.get_dot1x_enabled_interfaces)
         print_result(result)
+        if self.state_store:
+            hosts = nr.inventory.hosts.values()
+            skipped = sum(1 for host in hosts if host.get("discovery_skipped"))
+            logging.info(
+                f"Config unchanged on {skipped} of {len(hosts)} hosts, "
+                f"reused their stored discovery"
+            )
         return self.collect_results(nr)
 
     def get_dot1x_enabled_interfaces(self, task) -> None:
-        result = task.run(task=netmiko_send_command, command_string="show dot1x all")
-        parsed_output = result.result
-        task.host["dot1x_interfaces"] = self.parse_dot1x_output(parsed_output)
+        task.host.data.pop("discovery_skipped", None)
+        marker = None
+        if self.state_store:
+            marker = self.send_command(task, self.change_marker_command)
+            marker = marker.result.strip()
+            stored = self.state_store.get(task.host.name, "discovery")
+            if marker and stored and stored["marker"] == marker:
+                task.host["dot1x_interfaces"] = stored["dot1x_interfaces"]
+                task.host["discovery_skipped"] = True
+                return
+        result = self.send_command(task, "show dot1x all")
+        self.process_collected(task.host, {"show dot1x all": result.result})
+        if marker:
+            self.state_store.put(
+                task.host.name,
+                "discovery",
+                {
+                    "marker": marker,
+                    "dot1x_interfaces": task.host["dot1x_interfaces"],
+                },
+            )
+
+    def process_collected(self, host: Host, outputs: Dict[str, str]) -> None:
+        host["dot1x_interfaces"] = self.parse_dot1x_output(outputs["show dot1x all"])
 
     def parse_dot1x_output(self, output: str) -> list:
-        parsed_output = parse_output(
+        parsed_output = self.parse_output(
             platform="cisco_ios", command="show dot1x all", data=output
         )
         interfaces = [entry["interface"] for entry in parsed_output if "interface" in entry]
         return interfaces
 
-    def collect_results(self, nr: Nornir) -> list:
-        data = []
+    def collect_results(self, nr: Nornir) -> ResultTable:
+        data = ResultTable(["host", "interface"])
         for host in nr.inventory.hosts.values():
             if "dot1x_interfaces" in host.keys():
                 for interface in host["dot1x_interfaces"]:
-                    data.append({
-                        "host": host.name,
-                        "interface": interface
-                    })
+                    data.append(host=host.name, interface=interface)
         return data
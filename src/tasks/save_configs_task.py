@@ -2,11 +2,16 @@ from .base_task import BaseTask
 from nornir_netmiko.tasks import netmiko_save_config
 from nornir_utils.plugins.functions import print_result
 from nornir.core import Nornir
-from typing import List, Dict, Any
+from nornir.core.task import Task
+from typing import List, Dict, Any, Optional
 import logging
+from src.recording.config_archive import BaseConfigArchive
 
 
 class SaveConfigsTask(BaseTask):
+    def __init__(self, archive: Optional[BaseConfigArchive] = None) -> None:
+        self.archive = archive
+
     def propose(self, nr: Nornir) -> List[Dict[str, Any]]:
         logging.info("Proposal does not apply")
         ...
@@ -16,8 +21,34 @@ class SaveConfigsTask(BaseTask):
         logging.info("Applying configuration save...")
         result = nr.run(task=netmiko_save_config)
         print_result(result)
+        if self.archive:
+            self.backup(nr)
         return self.collect_results(nr)
 
+    def backup(self, nr: Nornir) -> None:
+        logging.info("Archiving running configurations...")
+        result = nr.run(task=self.backup_config)
+        print_result(result)
+        pointers = {
+            host.name: host["config_digest"]
+            for host in nr.inventory.hosts.values()
+            if "config_digest" in host.keys()
+        }
+        changed = sum(
+            1 for host in nr.inventory.hosts.values() if host.get("config_changed")
+        )
+        run_id = self.archive.record_run(pointers)
+        logging.info(
+            f"Archived {len(pointers)} configurations as run {run_id}, "
+            f"{changed} changed"
+        )
+
+    def backup_config(self, task: Task) -> None:
+        running_config = self.send_command(task, "show running-config").result
+        digest, changed = self.archive.store(task.host.name, running_config)
+        task.host["config_digest"] = digest
+        task.host["config_changed"] = changed
+
     def print_proposed_configuration(self, nr: Nornir) -> None:
         for host in nr.inventory.hosts.values():
             if "running_config" in host.keys():
@@ -27,7 +58,15 @@ class SaveConfigsTask(BaseTask):
     def collect_results(self, nr: Nornir) -> List[Dict[str, Any]]:
         data = []
         for host in nr.inventory.hosts.values():
-            if "running_config" in host.keys():
+            if "config_digest" in host.keys():
+                data.append(
+                    {
+                        "host": host.name,
+                        "config_digest": host["config_digest"],
+                        "config_changed": host["config_changed"],
+                    }
+                )
+            elif "running_config" in host.keys():
                 data.append(
                     {"host": host.name, "running_config": host["running_config"]}
                 )
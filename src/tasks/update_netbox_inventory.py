@@ -1,21 +1,29 @@
 # src/tasks/update_netbox_inventory_task.py
 
+import json
 import logging
 import os
 import random
 import string
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import meraki
 from nornir.core.task import Task, Result
-from nornir_netmiko.tasks import netmiko_send_command
 from nornir_utils.plugins.functions import print_result
-from ntc_templates.parse import parse_output
-from netutils.interface import canonical_interface_name
 from netutils.ip import ipaddress_interface
 from ipaddress import IPv4Interface
 import pynetbox
 from .base_task import BaseTask
+from src.instrumentation.timing import (
+    RUN,
+    TimedSession,
+    instrument_api,
+    set_current_host,
+)
+from src.collection.backends import CliBackend
+from src.netbox.graphql import NetBoxGraphQL, NetBoxSnapshot
 
 load_dotenv()
 
@@ -34,6 +42,13 @@ def generate_slug(raw_string, prefix):
     return (f"{prefix}-{converted}").lower()
 
 
+# Lines of "show interface" that feed the sync; counters and rates change on
+# every poll and are left out of the change hash.
+INTERFACE_SYNC_LINES = re.compile(
+    r"^(\S|\s+(Hardware is|Description:|Internet address is|MTU ))"
+)
+
+
 def generate_unique_string(min_length=1, max_length=100):
     allowed_chars = string.ascii_letters + string.digits + "-_"
     length = random.randint(min_length, max_length)
@@ -41,24 +56,150 @@ def generate_unique_string(min_length=1, max_length=100):
 
 
 class UpdateNetBoxInventoryTask(BaseTask):
-    def __init__(self):
-        self.nb = pynetbox.api(
-            os.getenv("NETBOX_API_URL"), token=os.getenv("NETBOX_API_TOKEN")
+    sync_commands = ["show interface", "show vrf", "show version"]
+
+    def __init__(
+        self,
+        state_store=None,
+        graphql_batch_size=None,
+        interface_workers=16,
+        backends=None,
+        parse_cache=None,
+    ):
+        self.state_store = state_store
+        self.parse_cache = parse_cache
+        # Platform to CollectionBackend, e.g. {"ios": NapalmBackend()}.
+        self.backends = backends
+        self.nb = instrument_api(
+            pynetbox.api(
+                os.getenv("NETBOX_API_URL"), token=os.getenv("NETBOX_API_TOKEN")
+            )
         )
+        # With a batch size, NetBox state is read up front with one GraphQL
+        # query per batch of devices instead of REST lookups per object.
+        self.graphql_batch_size = graphql_batch_size
+        self.snapshot = None
+        # Size of the pool shared by all hosts for interface-level sync.
+        self.interface_workers = interface_workers
+        self.interface_executor = None
+        self.key_locks = {}
+        self.key_locks_lock = threading.Lock()
 
     def propose(self, nr):
         logging.info("Proposing NetBox inventory update...")
-        result = nr.run(task=self.update_netbox_inventory)
+        result = self.run_sync(nr)
         print_result(result)
         self.print_proposed_changes(nr)
         return self.collect_results(nr)
 
     def apply(self, nr):
         logging.info("Applying NetBox inventory update...")
-        result = nr.run(task=self.update_netbox_inventory)
+        result = self.run_sync(nr)
         # print_result(result)
         return self.collect_results(nr)
 
+    def run_sync(self, nr):
+        # Nornir's workers and the interface pool all share one session.
+        workers = getattr(nr.runner, "num_workers", 1)
+        self.nb.http_session.size_pool(self.interface_workers + workers)
+        with ThreadPoolExecutor(
+            max_workers=self.interface_workers, thread_name_prefix="netbox-sync"
+        ) as executor:
+            self.interface_executor = executor
+            try:
+                return self.sync(nr)
+            finally:
+                self.interface_executor = None
+
+    def map_interfaces(self, hostname, fn, items):
+        """Run ``fn`` over ``items`` on the shared interface pool and wait for
+        all of them, attributing their API time to ``hostname``."""
+        if self.interface_executor is None:
+            return [fn(item) for item in items]
+
+        def run(item):
+            set_current_host(hostname)
+            try:
+                return fn(item)
+            finally:
+                set_current_host(RUN)
+
+        futures = [self.interface_executor.submit(run, item) for item in items]
+        return [future.result() for future in futures]
+
+    def sync(self, nr):
+        self.snapshot = None
+        if self.graphql_batch_size:
+            nr.run(task=self.discover_device)
+            client = NetBoxGraphQL(
+                os.getenv("NETBOX_API_URL"),
+                os.getenv("NETBOX_API_TOKEN"),
+                session=TimedSession(read_only=True),
+            )
+            self.snapshot = NetBoxSnapshot.load(
+                self.nb, client, self.snapshot_targets(nr), self.graphql_batch_size
+            )
+        return nr.run(task=self.update_netbox_inventory)
+
+    def discover_device(self, task: Task) -> Result:
+        task.host.data.pop("netbox_status", None)
+        backend = self.backend(task.host)
+        if backend.name == "cli":
+            outputs = {
+                command: self.send_command(task, command).result
+                for command in self.sync_commands
+            }
+            sync_outputs = self.sync_outputs(outputs)
+            discovery = None
+        else:
+            # Structured backends return no counters, so the data itself
+            # serves for change detection.
+            discovery = {
+                "interfaces": self.vlan_interfaces(backend.interfaces(task)),
+                "vrfs": backend.vrfs(task),
+                "version_info": backend.facts(task),
+            }
+            sync_outputs = {backend.name: json.dumps(discovery, sort_keys=True)}
+        if self.outputs_unchanged(task.host.name, "netbox_sync", sync_outputs):
+            task.host["netbox_status"] = "unchanged"
+            return Result(host=task.host, result="Unchanged since the last sync.")
+        if discovery is None:
+            discovery = {
+                "interfaces": self.discover_interfaces(outputs["show interface"]),
+                "vrfs": self.discover_vrfs(outputs["show vrf"]),
+                "version_info": self.show_version(outputs["show version"]),
+            }
+        task.host["netbox_discovery"] = {**discovery, "sync_outputs": sync_outputs}
+        return Result(host=task.host, result="Discovered")
+
+    def snapshot_targets(self, nr) -> dict:
+        targets = {}
+        for host in nr.inventory.hosts.values():
+            if "netbox_discovery" not in host.keys():
+                continue
+            addresses = [
+                f"{details['ip_address']}/{details['prefix_length']}"
+                for details in host["netbox_discovery"]["interfaces"].values()
+            ]
+            addresses = [address for address in addresses if is_valid_ip(address)]
+            targets[host.name] = {
+                "addresses": addresses,
+                "prefixes": [
+                    str(IPv4Interface(address).network) for address in addresses
+                ],
+            }
+        return targets
+
+    def lookup(self, kind, key, fetch):
+        if self.snapshot is None:
+            return fetch()
+        return self.snapshot.get(kind, key)
+
+    def remember(self, kind, key, record):
+        if self.snapshot is not None:
+            self.snapshot.add(kind, key, record)
+        return record
+
     def update_netbox_inventory(self, task: Task) -> Result:
         hostname = task.host.name
         site = task.host.data.get("site_id")
@@ -66,8 +207,6 @@ class UpdateNetBoxInventoryTask(BaseTask):
         device_role = task.host.data.get("function")
         device_role = "Access Switch"
 
-        print(task.host.data)
-
         if not all([site, device_type, device_role]):
             return Result(
                 host=task.host,
@@ -77,22 +216,37 @@ class UpdateNetBoxInventoryTask(BaseTask):
 
         try:
             # Discover interfaces and IPs
-            interfaces = self.discover_interfaces(task)
-            vrfs = self.discover_vrfs(task)
-            version_info = self.show_version(task)
-
-            cisco_manufacturer = self.nb.dcim.manufacturers.get(
-                name="Cisco", slug="cisco"
+            if "netbox_discovery" not in task.host.keys():
+                self.discover_device(task)
+            if task.host.get("netbox_status") == "unchanged":
+                return Result(
+                    host=task.host,
+                    result=f"Device {hostname} is unchanged since the last sync.",
+                    failed=False,
+                )
+            discovery = task.host.data.pop("netbox_discovery")
+            interfaces = discovery["interfaces"]
+            vrfs = discovery["vrfs"]
+            version_info = discovery["version_info"]
+            sync_outputs = discovery["sync_outputs"]
+
+            cisco_manufacturer = self.lookup(
+                "manufacturer",
+                "Cisco",
+                lambda: self.nb.dcim.manufacturers.get(name="Cisco", slug="cisco"),
             )
 
-            devices = list(self.nb.dcim.devices.all())
-            matching_device = next(
-                (
-                    device
-                    for device in devices
-                    if device.name.lower() == hostname.lower()
+            matching_device = self.lookup(
+                "device",
+                hostname.lower(),
+                lambda: next(
+                    (
+                        device
+                        for device in self.nb.dcim.devices.all()
+                        if device.name.lower() == hostname.lower()
+                    ),
+                    None,
                 ),
-                None,
             )
 
             if matching_device is None:
@@ -105,32 +259,38 @@ class UpdateNetBoxInventoryTask(BaseTask):
                     },
                     "role": {"name": device_role},
                 }
-                device = self.nb.dcim.devices.create(device_data)
+                device = self.remember(
+                    "device",
+                    hostname.lower(),
+                    self.nb.dcim.devices.create(device_data),
+                )
             else:
                 device = matching_device
 
-            cisco_manufacturer = self.nb.dcim.manufacturers.get(
-                name="Cisco", slug="cisco"
-            )
-            platforms = [
-                platform.model
-                for platform in list(
-                    self.nb.dcim.device_types.filter(
-                        manufacturer_id=cisco_manufacturer.id
+            if self.snapshot is None:
+                platforms = [
+                    platform.model
+                    for platform in list(
+                        self.nb.dcim.device_types.filter(
+                            manufacturer_id=cisco_manufacturer.id
+                        )
                     )
-                )
-            ]
+                ]
+            else:
+                platforms = list(self.snapshot.index["device_type"])
 
             stack_count = 1
-
-            inventory_items = self.nb.dcim.inventory_items.all()
-            asset_tags = [item["asset_tag"] for item in inventory_items]
+            failed_items = []
 
             for version in version_info:
+                # Backends without per-unit MACs, such as NAPALM, omit them.
+                mac_addresses = version.get("mac_address") or [None] * len(
+                    version["hardware"]
+                )
                 for hardware, serial, mac_address in zip(
                     version["hardware"],
                     version["serial"],
-                    version["mac_address"],
+                    mac_addresses,
                 ):
                     try:
                         data = {
@@ -143,8 +303,9 @@ class UpdateNetBoxInventoryTask(BaseTask):
                             },
                             "part_id": hardware,
                             "serial": serial,
-                            "asset_tag": mac_address,
                         }
+                        if mac_address:
+                            data["asset_tag"] = mac_address
 
                         if hardware not in platforms:
                             device_type_data = {
@@ -152,8 +313,10 @@ class UpdateNetBoxInventoryTask(BaseTask):
                                 "slug": generate_unique_string(),
                                 "model": hardware,
                             }
-                            new_device_type = self.nb.dcim.device_types.create(
-                                device_type_data
+                            new_device_type = self.remember(
+                                "device_type",
+                                hardware,
+                                self.nb.dcim.device_types.create(device_type_data),
                             )
                             device.device_type = new_device_type.id
                         else:
@@ -161,8 +324,10 @@ class UpdateNetBoxInventoryTask(BaseTask):
                                 "manufacturer_id": cisco_manufacturer.id,
                                 "model": hardware,
                             }
-                            existing_device_type = self.nb.dcim.device_types.get(
-                                model=hardware
+                            existing_device_type = self.lookup(
+                                "device_type",
+                                hardware,
+                                lambda: self.nb.dcim.device_types.get(model=hardware),
                             )
                             slug = generate_slug(
                                 raw_string=hardware, prefix=cisco_manufacturer.name
@@ -174,18 +339,26 @@ class UpdateNetBoxInventoryTask(BaseTask):
                             str(device.device_type.model) not in version["hardware"]
                             or str(device.device_type.model) == "9300L"
                         ):
-                            device.device_type = list(
-                                self.nb.dcim.device_types.filter(
-                                    model=hardware,
-                                    manufacturer_id=cisco_manufacturer.id,
-                                )
-                            )[0].id
+                            device.device_type = self.lookup(
+                                "device_type",
+                                hardware,
+                                lambda: list(
+                                    self.nb.dcim.device_types.filter(
+                                        model=hardware,
+                                        manufacturer_id=cisco_manufacturer.id,
+                                    )
+                                )[0],
+                            ).id
                             print("Incorrect device type identified")
                             device.save()
 
                         device.save()
-                        device_type_query = self.nb.dcim.device_types.get(
-                            model=hardware, manufacturer_id=cisco_manufacturer.id
+                        device_type_query = self.lookup(
+                            "device_type",
+                            hardware,
+                            lambda: self.nb.dcim.device_types.get(
+                                model=hardware, manufacturer_id=cisco_manufacturer.id
+                            ),
                         )
 
                         device_type_slug = generate_slug(
@@ -201,83 +374,17 @@ class UpdateNetBoxInventoryTask(BaseTask):
                         stack_count += 1
                     except Exception as e:
                         logging.error(f"Error processing hardware {hardware}: {e}")
-
-            for interface_name, interface_details in interfaces.items():
-                try:
-                    vrf = self.nb.ipam.vrfs.get(name="Global")
-                    interface_data = {
-                        "device": device.id,
-                        "name": interface_name,
-                        "type": "virtual",
-                        "vrf": vrf.id,
-                    }
-                    existing_interface = self.nb.dcim.interfaces.get(
-                        device_id=device.id, name=interface_name
-                    )
-                    if existing_interface:
-                        interface = existing_interface
-                    else:
-                        interface = self.nb.dcim.interfaces.create(interface_data)
-
-                    ip_address = f"{interface_details['ip_address']}/{interface_details['prefix_length']}"
-                    interface.description = interface_details.get("description", None)
-                    interface.mac_address = interface_details.get("mac_address", None)
-                    interface.save()
-
-                    existing_ip_address = self.nb.ipam.ip_addresses.get(
-                        address=ip_address
-                    )
-                    if is_valid_ip(ip_address):
-                        if existing_ip_address:
-                            netbox_ip = self.nb.ipam.ip_addresses.get(
-                                address=ip_address
-                            )
-                        else:
-                            netbox_ip = self.nb.ipam.ip_addresses.create(
-                                address=ip_address
-                            )
-
-                        network_obj = IPv4Interface(ip_address)
-                        ipam_prefix = self.nb.ipam.prefixes.get(
-                            prefix=str(network_obj.network)
-                        )
-                        if not ipam_prefix:
-                            data = {
-                                "site": device.site.id,
-                                "prefix": str(network_obj.network),
-                                "vrf": vrf.id,
-                            }
-                            if network_obj.network.prefixlen > 30:
-                                data["role"] = self.nb.ipam.roles.get(
-                                    name="Transit Network"
-                                ).id
-
-                            self.nb.ipam.prefixes.create(data)
-                        else:
-                            ipam_prefix.site = device.site.id
-                            ipam_prefix.vrf = vrf.id
-                            ipam_prefix.save()
-
-                        netbox_ip.assigned = True
-                        netbox_ip.vrf = vrf.id
-                        netbox_ip.device_id = device.id
-                        netbox_ip.device = device.name
-                        netbox_ip.assigned_object_type = "dcim.interface"
-                        netbox_ip.assigned_object_id = interface.id
-                        netbox_ip.pa
-                        if interface.name == "Vlan69":
-                            netbox_ip.primary_ip = interface.id
-                            netbox_ip.primary_ip4 = interface.id
-                            netbox_ip.save()
-                            device.primary_ip = netbox_ip.id
-                            device.primary_ip4 = netbox_ip.id
-                            device.save()
-                        else:
-                            print(netbox_ip.__dict__)
-                            netbox_ip.save()
-                except Exception as e:
-                    logging.error(f"Error processing interface {interface_name}: {e}")
-
+                        failed_items.append(hardware)
+
+            # Interfaces are independent of each other, so they are synced on
+            # the shared pool; a large switch then spreads its interfaces over
+            # idle threads instead of holding up its own worker.
+            synced = self.map_interfaces(
+                hostname,
+                lambda item: self.sync_interface(device, *item),
+                list(interfaces.items()),
+            )
+            failed_items.extend(name for name, ok in zip(interfaces, synced) if not ok)
         except Exception as e:
             logging.error(f"Error updating device {hostname}: {e}")
             return Result(
@@ -286,12 +393,124 @@ class UpdateNetBoxInventoryTask(BaseTask):
                 failed=True,
             )
 
+        if failed_items:
+            # The outputs are not remembered, so the next run retries the
+            # device instead of skipping it as unchanged.
+            task.host["netbox_status"] = "incomplete"
+            return Result(
+                host=task.host,
+                result=f"Device {hostname} was only partly synced, failed: "
+                f"{', '.join(failed_items)}",
+                failed=True,
+            )
+        self.remember_outputs(hostname, "netbox_sync", sync_outputs)
+        task.host["netbox_status"] = "updated"
         return Result(
             host=task.host,
             result=f"Device {hostname} and its interfaces have been added to NetBox.",
             failed=False,
         )
 
+    def sync_interface(self, device, interface_name, interface_details) -> bool:
+        try:
+            vrf = self.lookup(
+                "vrf", "Global", lambda: self.nb.ipam.vrfs.get(name="Global")
+            )
+            interface_data = {
+                "device": device.id,
+                "name": interface_name,
+                "type": "virtual",
+                "vrf": vrf.id,
+            }
+            existing_interface = self.lookup(
+                "interface",
+                (device.id, interface_name),
+                lambda: self.nb.dcim.interfaces.get(
+                    device_id=device.id, name=interface_name
+                ),
+            )
+            if existing_interface:
+                interface = existing_interface
+            else:
+                interface = self.remember(
+                    "interface",
+                    (device.id, interface_name),
+                    self.nb.dcim.interfaces.create(interface_data),
+                )
+
+            ip_address = f"{interface_details['ip_address']}/{interface_details['prefix_length']}"
+            interface.description = interface_details.get("description", None)
+            interface.mac_address = interface_details.get("mac_address", None)
+            interface.save()
+
+            if is_valid_ip(ip_address):
+                with self.key_lock("ip_address", ip_address):
+                    netbox_ip = self.lookup(
+                        "ip_address",
+                        ip_address,
+                        lambda: self.nb.ipam.ip_addresses.get(address=ip_address),
+                    )
+                    if not netbox_ip:
+                        netbox_ip = self.remember(
+                            "ip_address",
+                            ip_address,
+                            self.nb.ipam.ip_addresses.create(address=ip_address),
+                        )
+
+                network = str(IPv4Interface(ip_address).network)
+                with self.key_lock("prefix", network):
+                    self.sync_prefix(device, vrf, network)
+
+                netbox_ip.assigned = True
+                netbox_ip.vrf = vrf.id
+                netbox_ip.device_id = device.id
+                netbox_ip.device = device.name
+                netbox_ip.assigned_object_type = "dcim.interface"
+                netbox_ip.assigned_object_id = interface.id
+                if interface.name == "Vlan69":
+                    netbox_ip.primary_ip = interface.id
+                    netbox_ip.primary_ip4 = interface.id
+                    netbox_ip.save()
+                    device.primary_ip = netbox_ip.id
+                    device.primary_ip4 = netbox_ip.id
+                    device.save()
+                else:
+                    netbox_ip.save()
+        except Exception as e:
+            logging.error(f"Error processing interface {interface_name}: {e}")
+            return False
+        return True
+
+    def sync_prefix(self, device, vrf, network):
+        ipam_prefix = self.lookup(
+            "prefix", network, lambda: self.nb.ipam.prefixes.get(prefix=network)
+        )
+        if not ipam_prefix:
+            data = {
+                "site": device.site.id,
+                "prefix": network,
+                "vrf": vrf.id,
+            }
+            if IPv4Interface(network).network.prefixlen > 30:
+                data["role"] = self.lookup(
+                    "role",
+                    "Transit Network",
+                    lambda: self.nb.ipam.roles.get(name="Transit Network"),
+                ).id
+
+            self.remember("prefix", network, self.nb.ipam.prefixes.create(data))
+        else:
+            ipam_prefix.site = device.site.id
+            ipam_prefix.vrf = vrf.id
+            ipam_prefix.save()
+
+    def key_lock(self, kind, key):
+        """Lock for one NetBox object, held across its lookup and create so
+        two hosts sharing it, such as switches on one subnet, cannot both
+        create it."""
+        with self.key_locks_lock:
+            return self.key_locks.setdefault((kind, key), threading.Lock())
+
     def create_device(self, name, site, device_type, role):
         device_data = {
             "name": name,
@@ -305,41 +524,33 @@ class UpdateNetBoxInventoryTask(BaseTask):
         interface_data = {"device": device_id, "name": name, "type": interface_type}
         return self.nb.dcim.interfaces.create(interface_data)
 
-    def discover_interfaces(self, task: Task) -> dict:
-        vlan_result = task.run(
-            task=netmiko_send_command, command_string="show interface"
+    def sync_outputs(self, outputs: dict) -> dict:
+        sync_outputs = dict(outputs)
+        sync_outputs["show interface"] = "\n".join(
+            line
+            for line in outputs["show interface"].splitlines()
+            if INTERFACE_SYNC_LINES.match(line)
         )
-        parsed_vlan = parse_output(
-            platform="cisco_ios",
-            command="show interface",
-            data=vlan_result.result,
+        sync_outputs["show version"] = "\n".join(
+            line
+            for line in outputs["show version"].splitlines()
+            if " uptime is " not in line
         )
-        return {
-            entry["interface"]: entry
-            for entry in parsed_vlan
-            if entry["interface"].startswith("Vlan")
-        }
+        return sync_outputs
 
-    def discover_vrfs(self, task: Task) -> dict:
-        result = task.run(task=netmiko_send_command, command_string="show vrf")
-        parsed = parse_output(
-            platform="cisco_ios",
-            command="show vrf",
-            data=result.result,
-        )
+    def discover_interfaces(self, output: str) -> dict:
+        return self.vlan_interfaces(CliBackend(self).parse_interfaces(output))
+
+    def vlan_interfaces(self, interfaces: dict) -> dict:
         return {
-            canonical_interface_name(interface): entry["name"]
-            for entry in parsed
-            for interface in entry["interfaces"]
+            name: entry for name, entry in interfaces.items() if name.startswith("Vlan")
         }
 
-    def show_version(self, task: Task) -> dict:
-        result = task.run(task=netmiko_send_command, command_string="show version")
-        return parse_output(
-            platform="cisco_ios",
-            command="show version",
-            data=result.result,
-        )
+    def discover_vrfs(self, output: str) -> dict:
+        return CliBackend(self).parse_vrfs(output)
+
+    def show_version(self, output: str) -> dict:
+        return CliBackend(self).parse_facts(output)
 
     def print_proposed_changes(self, nr):
         for host in nr.inventory.hosts.values():
@@ -349,6 +560,6 @@ class UpdateNetBoxInventoryTask(BaseTask):
 
     def collect_results(self, nr):
         return [
-            {"host": host.name, "status": "updated"}
+            {"host": host.name, "status": host.get("netbox_status", "updated")}
             for host in nr.inventory.hosts.values()
         ]
@@ -5,8 +5,10 @@ import random
 import string
 from dotenv import load_dotenv
 from ipaddress import IPv4Interface, ip_network, ip_address
+from typing import Any, Dict, Iterable, List
 import pynetbox
 import meraki
+from src.instrumentation.timing import instrument_api, instrument_meraki
 
 load_dotenv()
 
@@ -31,235 +33,396 @@ def generate_unique_string(min_length=1, max_length=100):
     return "".join(random.choice(allowed_chars) for _ in range(length))
 
 
-def get_or_create_site(nb, ip, network_name):
+def chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def related_id(record, field):
+    # serialize() reduces nested records to their IDs without a lookup.
+    return record.serialize().get(field)
+
+
+def match_site(networks, ip):
     ip_obj = ip_address(ip)
-    prefixes = nb.ipam.prefixes.all()
-    for prefix in prefixes:
-        network = ip_network(prefix.prefix)
+    for network, site_name in networks:
         if ip_obj in network:
-            return prefix.site.name
-
-    # If no matching site found, create a new site if the network name is valid
-    if re.match(r"^[a-zA-Z]{2}\d$", network_name):
-        site_data = {"name": network_name, "slug": network_name.lower()}
-        new_site = nb.dcim.sites.create(site_data)
-        return new_site.name
-    return "Unknown"
+            return site_name
+    return None
 
 
 class UpdateNetBoxWAPInventory:
-    def __init__(self):
-        self.nb = pynetbox.api(
-            os.getenv("NETBOX_API_URL"), token=os.getenv("NETBOX_API_TOKEN")
+    """Reconciles the Meraki organisation's access points into NetBox.
+
+    NetBox state is read once per run, joined to the Meraki inventory in
+    memory by serial and then by name, and only the objects that differ are
+    written, in bulk. The number of API calls grows with the number of
+    changes, not the number of APs.
+    """
+
+    interface_name = "eth0"
+    prefix_length = 16
+    # Objects per bulk request, and values per multi-value filter.
+    batch_size = 200
+
+    def __init__(self, device_role=3, delete_missing=False):
+        self.nb = instrument_api(
+            pynetbox.api(
+                os.getenv("NETBOX_API_URL"), token=os.getenv("NETBOX_API_TOKEN")
+            )
         )
-        self.meraki_dashboard = meraki.DashboardAPI(
-            api_key=os.getenv("MERAKI_API_KEY"), output_log=False
+        self.meraki_dashboard = instrument_meraki(
+            meraki.DashboardAPI(api_key=os.getenv("MERAKI_API_KEY"), output_log=False)
         )
+        self.device_role = device_role
+        # APs in NetBox with no match in Meraki are reported, and only
+        # deleted when this is set.
+        self.delete_missing = delete_missing
 
     def get_meraki_devices(self):
         orgs = self.meraki_dashboard.organizations.getOrganizations()
         org_id = [
             org["id"] for org in orgs if org["name"] == os.getenv("MERAKI_ORG_NAME")
         ][0]
-        return self.meraki_dashboard.organizations.getOrganizationDevices(org_id)
-
-    def update_netbox_inventory(self):
-        logging.info("Updating NetBox inventory with Meraki WAPs...")
-
-        # Get Meraki devices
-        meraki_devices = self.get_meraki_devices()
-
-        cisco_manufacturer = self.nb.dcim.manufacturers.get(name="Cisco", slug="cisco")
+        return self.meraki_dashboard.organizations.getOrganizationDevices(
+            org_id, total_pages="all"
+        )
 
+    def get_access_points(self, meraki_devices):
+        access_points = []
         for device in meraki_devices:
-            if device["model"].startswith("MR"):
-                hostname = device["name"]
-                ip_address = device.get("lanIp")
-                if not ip_address:
-                    logging.warning(f"Device {hostname} has no LAN IP. Skipping.")
-                    continue
-
-                network_name = device["networkId"]
-                site_name = get_or_create_site(self.nb, ip_address, network_name)
-                device_role = 3
-                device_type_model = device["model"]
-
-                devices = list(self.nb.dcim.devices.all())
-                matching_device = next(
-                    (dev for dev in devices if dev.name.lower() == hostname.lower()),
-                    None,
+            if not device["model"].startswith("MR"):
+                continue
+            if not device.get("lanIp"):
+                logging.warning(f"Device {device['name']} has no LAN IP. Skipping.")
+                continue
+            access_points.append(device)
+        return access_points
+
+    def filter_in(self, endpoint, field, values) -> List[Any]:
+        records = []
+        for batch in chunks(sorted(set(values)), self.batch_size):
+            records.extend(endpoint.filter(**{field: batch}))
+        return records
+
+    def fetch_state(self, access_points) -> Dict[str, Any]:
+        """NetBox state for the run. ``devices`` holds every device, whatever
+        its role, that shares a serial or name with an AP, so an AP filed
+        under another role is updated rather than created twice;
+        ``role_devices`` holds every device with the AP role."""
+        nb = self.nb
+        cisco_manufacturer = nb.dcim.manufacturers.get(name="Cisco", slug="cisco")
+        addresses = [
+            f"{device['lanIp']}/{self.prefix_length}" for device in access_points
+        ]
+        networks = [
+            (ip_network(prefix.prefix), prefix) for prefix in nb.ipam.prefixes.all()
+        ]
+        return {
+            "manufacturer": cisco_manufacturer,
+            "vrf": nb.ipam.vrfs.get(name="Global"),
+            "device_types": {
+                device_type.model: device_type
+                for device_type in nb.dcim.device_types.filter(
+                    manufacturer_id=cisco_manufacturer.id
                 )
-
-                if device["model"] not in [
-                    platform.model
-                    for platform in list(
-                        self.nb.dcim.device_types.filter(
-                            manufacturer_id=cisco_manufacturer.id
-                        )
+            },
+            "devices": list(
+                {
+                    device.id: device
+                    for field, values in (
+                        ("serial__ie", [d["serial"] for d in access_points]),
+                        ("name__ie", [d["name"] for d in access_points]),
                     )
-                ]:
-                    device_type_data = {
-                        "manufacturer": cisco_manufacturer.id,
-                        "slug": generate_slug(
-                            raw_string=device["model"], prefix=cisco_manufacturer.name
-                        ),
-                        "model": device["model"],
-                    }
-                    device_type_query = self.nb.dcim.device_types.create(
-                        device_type_data
-                    )
-                else:
-                    device_type_query = self.nb.dcim.device_types.get(
-                        model=device["model"]
-                    )
-
-                if matching_device is None:
-                    device_data = {
-                        "name": hostname,
-                        "role": device_role,
-                        "device_type": device_type_query.id,
-                        "slug": generate_slug(
-                            raw_string=device["name"], prefix=cisco_manufacturer.name
-                        ),
+                    for device in self.filter_in(nb.dcim.devices, field, values)
+                }.values()
+            ),
+            "role_devices": list(nb.dcim.devices.filter(role_id=self.device_role)),
+            "ip_addresses": {
+                ip.address: ip
+                for ip in self.filter_in(nb.ipam.ip_addresses, "address", addresses)
+            },
+            "networks": networks,
+            "prefixes": {str(network): prefix for network, prefix in networks},
+        }
+
+    def match_devices(self, access_points, devices):
+        """Pairs each AP with its NetBox device by serial, then by name."""
+        by_serial = {d.serial.upper(): d for d in devices if getattr(d, "serial", None)}
+        by_name = {d.name.lower(): d for d in devices if d.name}
+        matched = {}
+        pairs = []
+        for device in access_points:
+            nb_device = by_serial.get((device.get("serial") or "").upper())
+            if nb_device is None or nb_device.id in matched:
+                nb_device = by_name.get(device["name"].lower())
+            if nb_device is not None and nb_device.id in matched:
+                nb_device = None
+            if nb_device is not None:
+                matched[nb_device.id] = device
+            pairs.append((device, nb_device))
+        return pairs
+
+    def missing_devices(self, meraki_devices, role_devices, pairs) -> List[Any]:
+        """NetBox devices with the AP role that match nothing in the Meraki
+        organisation. This checks the full device list rather than the APs
+        being synced, so an AP skipped for having no LAN IP, or another
+        Meraki device sharing the role, is not reported as gone."""
+        matched = {nb_device.id for _, nb_device in pairs if nb_device is not None}
+        serials = {(d.get("serial") or "").upper() for d in meraki_devices}
+        names = {(d.get("name") or "").lower() for d in meraki_devices}
+        return [
+            d
+            for d in role_devices
+            if d.id not in matched
+            and (getattr(d, "serial", None) or "").upper() not in serials
+            and (d.name or "").lower() not in names
+        ]
+
+    def bulk_create(self, endpoint, objects) -> List[Any]:
+        created = []
+        for batch in chunks(objects, self.batch_size):
+            created.extend(endpoint.create(batch))
+        return created
+
+    def bulk_update(self, endpoint, objects) -> None:
+        for batch in chunks(objects, self.batch_size):
+            endpoint.update(batch)
+
+    def sync_device_types(self, access_points, state) -> Dict[str, Any]:
+        manufacturer = state["manufacturer"]
+        device_types = state["device_types"]
+        models = sorted({device["model"] for device in access_points})
+        new_types = [
+            {
+                "manufacturer": manufacturer.id,
+                "slug": generate_slug(raw_string=model, prefix=manufacturer.name),
+                "model": model,
+            }
+            for model in models
+            if model not in device_types
+        ]
+        slug_updates = [
+            {
+                "id": device_types[model].id,
+                "slug": generate_slug(raw_string=model, prefix=manufacturer.name),
+            }
+            for model in models
+            if model in device_types
+            and device_types[model].slug
+            != generate_slug(raw_string=model, prefix=manufacturer.name)
+        ]
+        for device_type in self.bulk_create(self.nb.dcim.device_types, new_types):
+            device_types[device_type.model] = device_type
+        self.bulk_update(self.nb.dcim.device_types, slug_updates)
+        logging.info(
+            f"Device types: {len(new_types)} created, {len(slug_updates)} updated"
+        )
+        return device_types
+
+    def site_names(self, access_points, state) -> Dict[str, str]:
+        """Site per AP serial, from the NetBox prefix containing its IP. APs
+        outside every prefix get a site named after their network when the
+        name looks like a site code, else ``Unknown``."""
+        networks = [
+            (network, prefix.site.name if prefix.site else None)
+            for network, prefix in state["networks"]
+        ]
+        sites = {}
+        new_sites = {}
+        for device in access_points:
+            site_name = match_site(networks, device["lanIp"])
+            if site_name is None:
+                network_name = device["networkId"]
+                if re.match(r"^[a-zA-Z]{2}\d$", network_name):
+                    site_name = network_name
+                    new_sites[network_name] = {
+                        "name": network_name,
+                        "slug": network_name.lower(),
                     }
-                    if site_name:
-                        device_data["site"] = {"name": site_name}
-
-                    device_nb = self.nb.dcim.devices.create(device_data)
                 else:
-                    device_nb = matching_device
-
-                data = {
-                    "device": device_nb.id,
-                    "name": hostname,
-                    "role": device_role,
-                    "manufacturer": {
-                        "name": cisco_manufacturer.name,
-                        "slug": cisco_manufacturer.slug,
-                    },
-                    "part_id": device["model"],
+                    site_name = "Unknown"
+            sites[device["serial"]] = site_name
+        self.bulk_create(self.nb.dcim.sites, list(new_sites.values()))
+        return sites
+
+    def sync_devices(self, meraki_devices, access_points, state, device_types):
+        manufacturer = state["manufacturer"]
+        pairs = self.match_devices(access_points, state["devices"])
+        missing = self.missing_devices(meraki_devices, state["role_devices"], pairs)
+        sites = self.site_names(
+            [device for device, nb_device in pairs if nb_device is None], state
+        )
+        new_devices = []
+        updates = []
+        for device, nb_device in pairs:
+            device_type_id = device_types[device["model"]].id
+            if nb_device is None:
+                device_data = {
+                    "name": device["name"],
+                    "role": self.device_role,
+                    "device_type": device_type_id,
                     "serial": device["serial"],
-                    "asset_tag": device["mac"],
+                    "slug": generate_slug(
+                        raw_string=device["name"], prefix=manufacturer.name
+                    ),
                 }
-
-                if device["model"] not in [
-                    platform.model
-                    for platform in self.nb.dcim.device_types.filter(
-                        manufacturer_id=cisco_manufacturer.id
-                    )
-                ]:
-                    device_type_data = {
-                        "manufacturer": cisco_manufacturer.id,
-                        "slug": generate_slug(
-                            raw_string=device["model"], prefix=cisco_manufacturer.name
-                        ),
-                        "model": device["model"],
-                    }
-                    new_device_type = self.nb.dcim.device_types.create(device_type_data)
-                    device_nb.device_type = new_device_type.id
-                else:
-                    device_type_data = {
-                        "manufacturer_id": cisco_manufacturer.id,
-                        "model": device["model"],
+                if sites[device["serial"]]:
+                    device_data["site"] = {"name": sites[device["serial"]]}
+                new_devices.append(device_data)
+                continue
+            changes = {}
+            if related_id(nb_device, "role") != self.device_role:
+                changes["role"] = self.device_role
+            if related_id(nb_device, "device_type") != device_type_id:
+                changes["device_type"] = device_type_id
+            if getattr(nb_device, "serial", None) != device["serial"]:
+                changes["serial"] = device["serial"]
+            if nb_device.name != device["name"]:
+                changes["name"] = device["name"]
+            if changes:
+                updates.append({"id": nb_device.id, **changes})
+
+        created = {
+            d.name.lower(): d
+            for d in self.bulk_create(self.nb.dcim.devices, new_devices)
+        }
+        self.bulk_update(self.nb.dcim.devices, updates)
+        pairs = [
+            (device, nb_device or created[device["name"].lower()])
+            for device, nb_device in pairs
+        ]
+        if missing and self.delete_missing:
+            for batch in chunks(missing, self.batch_size):
+                self.nb.dcim.devices.delete(batch)
+        logging.info(
+            f"Devices: {len(new_devices)} created, {len(updates)} updated, "
+            f"{len(missing)} not in Meraki"
+            + (" (deleted)" if missing and self.delete_missing else "")
+        )
+        return pairs
+
+    def sync_interfaces(self, pairs, state) -> Dict[int, Any]:
+        interfaces = {
+            interface.device.id: interface
+            for interface in self.filter_in(
+                self.nb.dcim.interfaces,
+                "device_id",
+                [nb_device.id for _, nb_device in pairs],
+            )
+            if interface.name == self.interface_name
+        }
+        vrf = state["vrf"]
+        new_interfaces = []
+        updates = []
+        for device, nb_device in pairs:
+            wanted = {
+                "description": "Primary interface",
+                "mac_address": device.get("mac"),
+            }
+            interface = interfaces.get(nb_device.id)
+            if interface is None:
+                new_interfaces.append(
+                    {
+                        "device": nb_device.id,
+                        "name": self.interface_name,
+                        "type": "virtual",
+                        "vrf": vrf.id,
+                        **wanted,
                     }
-                    existing_device_type = self.nb.dcim.device_types.get(
-                        model=device["model"]
-                    )
-                    slug = generate_slug(
-                        raw_string=device["model"], prefix=cisco_manufacturer.name
-                    )
-                    if existing_device_type.slug != slug:
-                        existing_device_type.slug = slug
-                        existing_device_type.save()
-
-                device_nb.save()
+                )
+                continue
+            changes = {
+                field: value
+                for field, value in wanted.items()
+                if (getattr(interface, field, None) or "").lower()
+                != (value or "").lower()
+            }
+            if changes:
+                updates.append({"id": interface.id, **changes})
+        for interface in self.bulk_create(self.nb.dcim.interfaces, new_interfaces):
+            interfaces[interface.device.id] = interface
+        self.bulk_update(self.nb.dcim.interfaces, updates)
+        logging.info(
+            f"Interfaces: {len(new_interfaces)} created, {len(updates)} updated"
+        )
+        return interfaces
+
+    def sync_prefixes(self, pairs, state) -> None:
+        vrf = state["vrf"]
+        prefixes = state["prefixes"]
+        wanted = {}
+        for device, nb_device in pairs:
+            network = IPv4Interface(f"{device['lanIp']}/{self.prefix_length}").network
+            wanted.setdefault(str(network), (network, nb_device.site.id))
+        new_prefixes = []
+        updates = []
+        for prefix, (network, site_id) in wanted.items():
+            existing = prefixes.get(prefix)
+            if existing is None:
+                data = {"site": site_id, "prefix": prefix, "vrf": vrf.id}
+                if network.prefixlen > 30:
+                    data["role"] = self.nb.ipam.roles.get(name="Transit Network").id
+                new_prefixes.append(data)
+            elif (
+                related_id(existing, "site") != site_id
+                or related_id(existing, "vrf") != vrf.id
+            ):
+                updates.append({"id": existing.id, "site": site_id, "vrf": vrf.id})
+        self.bulk_create(self.nb.ipam.prefixes, new_prefixes)
+        self.bulk_update(self.nb.ipam.prefixes, updates)
+        logging.info(f"Prefixes: {len(new_prefixes)} created, {len(updates)} updated")
+
+    def sync_ip_addresses(self, pairs, state, interfaces) -> None:
+        vrf = state["vrf"]
+        ip_addresses = state["ip_addresses"]
+        new_ips = []
+        updates = []
+        for device, nb_device in pairs:
+            address = f"{device['lanIp']}/{self.prefix_length}"
+            if not is_valid_ip(address):
+                continue
+            wanted = {
+                "vrf": vrf.id,
+                "assigned_object_type": "dcim.interface",
+                "assigned_object_id": interfaces[nb_device.id].id,
+            }
+            existing = ip_addresses.get(address)
+            if existing is None:
+                new_ips.append({"address": address, **wanted})
+                continue
+            current = {
+                "vrf": related_id(existing, "vrf"),
+                "assigned_object_type": getattr(existing, "assigned_object_type", None),
+                "assigned_object_id": getattr(existing, "assigned_object_id", None),
+            }
+            if current != wanted:
+                updates.append({"id": existing.id, **wanted})
+        for ip in self.bulk_create(self.nb.ipam.ip_addresses, new_ips):
+            ip_addresses[ip.address] = ip
+        self.bulk_update(self.nb.ipam.ip_addresses, updates)
+
+        primary_updates = []
+        for device, nb_device in pairs:
+            ip = ip_addresses.get(f"{device['lanIp']}/{self.prefix_length}")
+            if ip is not None and related_id(nb_device, "primary_ip4") != ip.id:
+                primary_updates.append({"id": nb_device.id, "primary_ip4": ip.id})
+        self.bulk_update(self.nb.dcim.devices, primary_updates)
+        logging.info(
+            f"IP addresses: {len(new_ips)} created, {len(updates)} updated, "
+            f"{len(primary_updates)} primary IPs set"
+        )
 
-                print(f"Created/Updated device {device_nb.name} with data: {data}")
+    def update_netbox_inventory(self):
+        logging.info("Updating NetBox inventory with Meraki WAPs...")
 
-                # Process interfaces and IPs for the device
-                interfaces = {
-                    "eth0": {
-                        "ip_address": ip_address,
-                        "description": "Primary interface",
-                        "mac_address": device.get("mac"),
-                    }
-                }
-                print(interfaces)
-
-                for interface_name, interface_details in interfaces.items():
-                    try:
-                        vrf = self.nb.ipam.vrfs.get(name="Global")
-                        interface_data = {
-                            "device": device_nb.id,
-                            "name": interface_name,
-                            "type": "virtual",
-                            "vrf": vrf.id,
-                        }
-                        existing_interface = self.nb.dcim.interfaces.get(
-                            device_id=device_nb.id, name=interface_name
-                        )
-                        if existing_interface:
-                            interface = existing_interface
-                        else:
-                            interface = self.nb.dcim.interfaces.create(interface_data)
-
-                        ip_address_with_prefix = f"{interface_details['ip_address']}/16"
-                        interface.description = interface_details.get(
-                            "description", None
-                        )
-                        interface.mac_address = interface_details.get(
-                            "mac_address", None
-                        )
-                        interface.save()
-
-                        existing_ip_address = self.nb.ipam.ip_addresses.get(
-                            address=ip_address_with_prefix
-                        )
-                        if is_valid_ip(ip_address_with_prefix):
-                            if existing_ip_address:
-                                netbox_ip = self.nb.ipam.ip_addresses.get(
-                                    address=ip_address_with_prefix
-                                )
-                            else:
-                                netbox_ip = self.nb.ipam.ip_addresses.create(
-                                    address=ip_address_with_prefix
-                                )
-
-                            network_obj = IPv4Interface(ip_address_with_prefix)
-                            ipam_prefix = self.nb.ipam.prefixes.get(
-                                prefix=str(network_obj.network)
-                            )
-                            if not ipam_prefix:
-                                data = {
-                                    "site": device_nb.site.id,
-                                    "prefix": str(network_obj.network),
-                                    "vrf": vrf.id,
-                                }
-                                if network_obj.network.prefixlen > 30:
-                                    data["role"] = self.nb.ipam.roles.get(
-                                        name="Transit Network"
-                                    ).id
-
-                                self.nb.ipam.prefixes.create(data)
-                            else:
-                                ipam_prefix.site = device_nb.site.id
-                                ipam_prefix.vrf = vrf.id
-                                ipam_prefix.save()
-
-                            netbox_ip.assigned = True
-                            netbox_ip.vrf = vrf.id
-                            netbox_ip.device_id = device_nb.id
-                            netbox_ip.device = device_nb.name
-                            netbox_ip.primary_ip = interface.id
-                            netbox_ip.primary_ip4 = interface.id
-                            netbox_ip.assigned_object_type = "dcim.interface"
-                            netbox_ip.assigned_object_id = interface.id
-                            netbox_ip.save()
-                            device_nb.primary_ip = netbox_ip.id
-                            device_nb.primary_ip4 = netbox_ip.id
-                            device_nb.save()
-
-                    except Exception as e:
-                        logging.error(
-                            f"Error processing interface {interface_name}: {e}"
-                        )
+        meraki_devices = self.get_meraki_devices()
+        access_points = self.get_access_points(meraki_devices)
+        state = self.fetch_state(access_points)
+
+        device_types = self.sync_device_types(access_points, state)
+        pairs = self.sync_devices(meraki_devices, access_points, state, device_types)
+        interfaces = self.sync_interfaces(pairs, state)
+        self.sync_prefixes(pairs, state)
+        self.sync_ip_addresses(pairs, state, interfaces)
+        logging.info(f"Reconciled {len(pairs)} Meraki access points with NetBox")
@@ -0,0 +1,28 @@
+import os
+from src.core.service import ExecutionService, ConnectionPool
+from src.inventory.csv_inventory import CSVInventory
+from src.tasks.bounce_ports_task import BouncePortsTask
+from src.tasks.save_configs_task import SaveConfigsTask
+from src.core.post_processing import PrintPostProcessor
+
+
+def main() -> None:
+    config_path = os.path.join("config", "config.yaml")
+
+    inventory_source = CSVInventory(config_path)
+
+    service = ExecutionService(
+        inventory_source=inventory_source,
+        tasks={
+            "bounce_ports": BouncePortsTask(),
+            "save_configs": SaveConfigsTask(),
+        },
+        config_file=config_path,
+        post_processors=[PrintPostProcessor()],
+        pool=ConnectionPool(max_connections=200, idle_timeout=600),
+    )
+    service.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import contextlib
+import io
+
+import pytest
+
+from benchmarks import simulated_devices
+from benchmarks.fake_netbox import FakeNetBox
+from benchmarks.run_benchmarks import SITES, build_nornir
+from src.recording.host_state import FileHostStateStore
+from src.tasks.update_netbox_inventory import UpdateNetBoxInventoryTask
+
+
+@pytest.fixture(scope="module")
+def netbox():
+    simulated_devices.install(connect_latency=0, command_latency=0)
+    return FakeNetBox().start()
+
+
+@pytest.mark.parametrize("graphql_batch_size", [None, 200])
+def test_second_run_skips_unchanged_devices(
+    netbox, monkeypatch, tmp_path, graphql_batch_size
+):
+    netbox.reset(SITES)
+    monkeypatch.setenv("NETBOX_API_URL", netbox.url)
+    monkeypatch.setenv("NETBOX_API_TOKEN", "0123456789abcdef0123456789abcdef01234567")
+    store = FileHostStateStore(str(tmp_path))
+
+    def run():
+        task = UpdateNetBoxInventoryTask(
+            state_store=store, graphql_batch_size=graphql_batch_size
+        )
+        before = sum(netbox.requests.values())
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = task.apply(build_nornir(20, 10))
+        return {row["status"] for row in rows}, sum(netbox.requests.values()) - before
+
+    statuses, _ = run()
+    assert statuses == {"updated"}
+    statuses, calls = run()
+    assert statuses == {"unchanged"}
+    assert calls == 0